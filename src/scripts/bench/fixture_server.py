@@ -0,0 +1,165 @@
+"""Local HTTP server that plays back the scraper fixtures.
+
+URLs look like /<routes>x<trips>/<source>/...; the size prefix scales the
+snapshot synthetically, so one server covers every benchmark variant:
+
+    /10x10/busx/            home page with 10 popular-route cards
+    /10x10/busx/route/3     route page with 10 trips
+    /10x10h/busx/route/3    same, plus the images, fonts, JS/CSS bundles
+                            and analytics script a real page pulls in
+
+Assets are served from /assets/ with synthetic bodies of realistic size.
+"""
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+OPERATORS = ["Green Bus", "Nakhonchai Air", "Sombat Tour", "Lomprayah", "Zingbus", "IntrCity SmartBus"]
+
+def _template(name):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+def _times(j):
+    dep = (6 * 60 + 17 * j) % (24 * 60)
+    arr = (dep + 150 + 7 * (j % 40)) % (24 * 60)
+    return f"{dep // 60:02d}:{dep % 60:02d}", f"{arr // 60:02d}:{arr % 60:02d}", 150 + 7 * (j % 40)
+
+def bookaway_home(routes):
+    links = "\n".join(f'    <li><a href="route/{i}">Route {i}</a></li>' for i in range(1, routes + 1))
+    return _template("bookaway_home.html").replace("{{ROUTES}}", links)
+
+def bookaway_route(n, trips):
+    return _template("bookaway_route.html").replace("{{N}}", str(n))
+
+def busx_home(routes):
+    cards = "\n".join(
+        f'    <div class="col-md-3"><a href="route/{i}"><div class="card card-popular-route">'
+        f'<div class="card-body"><h5 class="card-title">Bangkok - Pattaya {i}</h5></div></div></a></div>'
+        for i in range(1, routes + 1))
+    return _template("busx_home.html").replace("{{ROUTES}}", cards)
+
+def busx_route(n, trips):
+    rows = []
+    for j in range(trips):
+        dep, arr, _ = _times(j)
+        rows.append(
+            f'<div class="list-group-item disable-choose-depart"><div class="row">'
+            f'<p class="mb-0 show_name_carrier">{OPERATORS[j % len(OPERATORS)]}</p>'
+            f'<span class="pr-1 show-time color-second show_paypoint_boarding_time">{dep}</span>'
+            f'<span class="pr-1 show-time color-second show_paypoint_arrival_time">{arr}</span>'
+            f'<span class="show_chooes_price" data-show-chooes-base-price="{300 + j % 250}">฿ {300 + j % 250}</span>'
+            f'</div></div>')
+    return _template("busx_route.html").replace("{{TRIPS}}", "\n".join(rows))
+
+def redbus_home(routes):
+    anchors = "\n".join(f'  <a class="accordionLinks" href="bus-tickets/delhi-to-manali-{i}">Delhi to Manali {i}</a>'
+                        for i in range(1, routes + 1))
+    return _template("redbus_home.html").replace("{{ROUTES}}", anchors)
+
+def redbus_route(n, trips):
+    rows = []
+    for j in range(trips):
+        dep, arr, mins = _times(j)
+        rows.append(
+            f'<li class="tupleWrapper___aa6a16"><div class="travelsName___495898">{OPERATORS[j % len(OPERATORS)]}</div>'
+            f'<p class="boardingTime___aced27">{dep}</p><p class="droppingTime___616c2f">{arr}</p>'
+            f'<p class="duration___5b44b1">{mins // 60}h {mins % 60}m</p>'
+            f'<p class="finalFare___898bb7">₹{900 + j % 1200:,}</p></li>')
+    return _template("redbus_route.html").replace("{{TRIPS}}", "\n".join(rows))
+
+# name -> (content type, bytes); the bundle names are hashed like a real build's
+ASSETS = {
+    "app.3f9a1c.js": ("application/javascript", 350_000),
+    "vendor.8e21d0.js": ("application/javascript", 600_000),
+    "app.51c7be.css": ("text/css", 120_000),
+    "analytics.js": ("application/javascript", 90_000),
+    "font.woff2": ("font/woff2", 80_000),
+    "hero.jpg": ("image/jpeg", 250_000),
+    "logo.png": ("image/png", 30_000),
+}
+HEAVY_IMAGES = 12
+
+def _asset_body(name):
+    kind, size = ASSETS[name]
+    if kind in ("application/javascript", "text/css"):
+        # one big comment: valid JS/CSS that does nothing
+        return b"/*" + b"x" * (size - 4) + b"*/"
+    return b"\0" * size
+
+def heavy(html):
+    """Add the asset load of a production page to a fixture."""
+    head = ('<link rel="preload" href="/assets/font.woff2" as="font" type="font/woff2" crossorigin>'
+            '<link rel="stylesheet" href="/assets/app.51c7be.css">'
+            '<script src="/assets/vendor.8e21d0.js"></script><script src="/assets/app.3f9a1c.js"></script>'
+            '<script async src="/assets/analytics.js"></script>'
+            '<style>@font-face{font-family:f;src:url(/assets/font.woff2)}body{font-family:f}</style>')
+    imgs = '<img src="/assets/hero.jpg">' + "".join(
+        f'<img src="/assets/logo.png?v={i}">' for i in range(HEAVY_IMAGES))
+    return html.replace("</head>", head + "</head>", 1).replace("</body>", imgs + "</body>", 1)
+
+PAGES = {
+    "bookaway": (bookaway_home, bookaway_route),
+    "busx": (busx_home, busx_route),
+    "redbus": (redbus_home, redbus_route),
+}
+
+_PATH = re.compile(r"^/(\d+)x(\d+)(h?)/(\w+)/(.*)$")
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/assets/"):
+            name = path[len("/assets/"):]
+            if name not in ASSETS:
+                self.send_error(404)
+                return
+            self._send(_asset_body(name), ASSETS[name][0], "public, max-age=31536000, immutable")
+            return
+        m = _PATH.match(path)
+        if not m or m.group(4) not in PAGES:
+            self.send_error(404)
+            return
+        routes, trips, source, rest = int(m.group(1)), int(m.group(2)), m.group(4), m.group(5)
+        home, route = PAGES[source]
+        if not rest:
+            body = home(routes)
+        else:
+            num = re.search(r"(\d+)$", rest)
+            if not num:
+                self.send_error(404)
+                return
+            body = route(int(num.group(1)), trips)
+        if m.group(3):
+            body = heavy(body)
+        self._send(body.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send(self, data, content_type, cache_control=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if cache_control:
+            self.send_header("Cache-Control", cache_control)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def start_server(host="127.0.0.1", port=0):
+    """Start the fixture server on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+if __name__ == "__main__":
+    server, url = start_server(port=8765)
+    print(f"Serving fixtures on {url} (e.g. {url}/10x10/busx/)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,109 @@
+"""Page load time and memory with and without the network policy.
+
+Run from src/scripts:
+
+    python -m bench.network                         # all sources
+    python -m bench.network --sources redbus --routes 20 --out network.json
+
+Every case scrapes the "heavy" fixture pages (images, a web font, JS/CSS
+bundles and an analytics script, see bench/fixture_server.py) through the
+browser tier, in a fresh process so peak RSS is per case:
+
+    off    --full-network: everything is loaded
+    cold   policy on, empty asset cache
+    warm   policy on, asset cache filled by the cold case
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import tempfile
+import time
+
+from bench.fixture_server import start_server
+from bench.scrapers import SOURCES, _rss_mb
+
+MODES = ("off", "cold", "warm")
+
+def run_case(source, mode, base_url, routes, trips, cache_dir, concurrency):
+    """Child-process body for one (source, mode) case."""
+    os.environ["SCRAPER_FX_OFFLINE"] = "1"
+    import currency
+    currency.OFFLINE = True
+    from engine import Engine
+    from netpolicy import AssetCache
+
+    module = importlib.import_module(source)
+    site = module.SITE.replace(home_url=f"{base_url}/{routes}x{trips}h/{source}/", rate=0)
+    max_trips = None if source == "bookaway" else trips
+
+    async def go():
+        async with Engine(site, headless=True, concurrency=concurrency, http_first=False,
+                          network=mode != "off", asset_cache=AssetCache(cache_dir)) as engine:
+            start = time.perf_counter()
+            records = await engine.run(max_trips=max_trips)
+            return engine, records, time.perf_counter() - start
+
+    engine, records, wall = asyncio.run(go())
+    nav = engine.timings.get("navigate", {"seconds": 0, "count": 0})
+    counters = engine.metrics.counters
+    return {
+        "source": source,
+        "mode": mode,
+        "routes": engine.stats["routes"],
+        "trips": len(records),
+        "errors": engine.stats["errors"],
+        "wall_s": round(wall, 3),
+        "navigate_avg_ms": round(1000 * nav["seconds"] / nav["count"], 1) if nav["count"] else None,
+        "network_kib": round(engine.metrics.bytes.get("browser", 0) / 1024, 1),
+        "asset_cache_kib": round(engine.metrics.bytes.get("asset_cache", 0) / 1024, 1),
+        "blocked": sum(n for k, n in counters.items() if k.startswith("net_blocked_")) + counters.get("net_trackers", 0),
+        "peak_rss_mb": _rss_mb(resource.RUSAGE_SELF),
+        # the driver and its whole Chromium tree, summed (see memory.worker_rss_mb)
+        "browser_peak_rss_mb": round(engine.guard.peak_mb, 1),
+    }
+
+def run_all(sources, routes, trips, concurrency=5):
+    server, base_url = start_server()
+    ctx = mp.get_context("spawn")
+    results = []
+    try:
+        for source in sources:
+            cache_dir = tempfile.mkdtemp(prefix=f"asset_cache_{source}_")
+            try:
+                for mode in MODES:
+                    with ctx.Pool(1) as pool:
+                        res = pool.apply(run_case, (source, mode, base_url, routes, trips, cache_dir, concurrency))
+                    print(f"{source:<9} {mode:<5} {res['trips']:>6} trips  {res['navigate_avg_ms']:>8} ms/nav  "
+                          f"{res['network_kib']:>10.0f} KiB net  {res['asset_cache_kib']:>9.0f} KiB cache  "
+                          f"{res['blocked']:>5} blocked  {res['browser_peak_rss_mb']:>7.1f} MB browser")
+                    results.append(res)
+            finally:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+    finally:
+        server.shutdown()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Network policy benchmark")
+    parser.add_argument("--sources", default=",".join(SOURCES))
+    parser.add_argument("--routes", type=int, default=10)
+    parser.add_argument("--trips", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--out", default="bench_network.json")
+    args = parser.parse_args(argv)
+
+    results = run_all([s for s in args.sources.split(",") if s], args.routes, args.trips, args.concurrency)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "machine": platform.machine(), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Per-record cost of the inline parsing helpers vs the batch normalize stage.
+
+Run from src/scripts:
+
+    python -m bench.normalize                  # 1k, 10k and 100k synthetic records
+    python -m bench.normalize --sizes 10000 --out normalize_bench.json
+
+"Inline" is what a record goes through today (busx.compute_duration and
+clean_price_text, redbus.clean_price and parse_title_from_route_url,
+bookaway.convert_usd_to_inr, then store.typed_row); "batch" is one
+normalize.normalize_records call over the same records.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ["SCRAPER_FX_OFFLINE"] = "1"
+
+import currency
+currency.OFFLINE = True
+
+import bookaway
+import busx
+import redbus
+from normalize import normalize_records
+from store import typed_row
+
+SIZES = (1000, 10000, 100000)
+CITIES = ["bangkok", "pattaya", "chiang-mai", "delhi", "manali", "koh-samui", "koh-phangan", "hua-hin"]
+
+def synthetic_records(n, seed=0):
+    rnd = random.Random(seed)
+    records = []
+    for i in range(n):
+        a, b = rnd.sample(CITIES, 2)
+        dep = f"{rnd.randrange(24):02d}:{rnd.randrange(0, 60, 5):02d}"
+        arr = f"{rnd.randrange(24):02d}:{rnd.randrange(0, 60, 5):02d}"
+        usd = f"{rnd.randrange(5, 60)}" if i % 3 else f"{rnd.randrange(5, 30)}-{rnd.randrange(30, 60)}"
+        records.append({
+            "Route URL": f"https://www.redbus.in/bus-tickets/{a}-to-{b}",
+            "Operator": "" if i % 50 == 0 else f"Operator {i % 17}",
+            # bookaway default rows and busx trips without times carry "N/A" / ""
+            "Departure Time": "N/A" if i % 25 == 0 else dep,
+            "Arrival Time": "" if i % 30 == 0 else arr,
+            "Duration": "",
+            "Price": "฿0" if i % 40 == 0 else f"฿{rnd.randrange(100, 2000)}.00",
+            "USD": usd,
+        })
+    return records
+
+def inline(records):
+    rows = []
+    for r in records:
+        _, from_v, to_v = redbus.parse_title_from_route_url(r["Route URL"])
+        rec = {
+            "Route URL": r["Route URL"],
+            "From": from_v,
+            "To": to_v,
+            "Operator": r["Operator"],
+            "Departure Time": r["Departure Time"],
+            "Arrival Time": r["Arrival Time"],
+            "Duration": busx.compute_duration(r["Departure Time"], r["Arrival Time"]),
+            "Price": busx.clean_price_text(r["Price"]),
+            "Price in INR": bookaway.convert_usd_to_inr(r["USD"]),
+        }
+        redbus.clean_price(r["Price"])
+        rows.append(typed_row(rec, "bench"))
+    return rows
+
+def batch(records):
+    return normalize_records(records, "bench")
+
+def timeit(fn, records, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(records)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, repeat=3):
+    results = []
+    print(f"{'records':>8} {'inline us/rec':>14} {'batch us/rec':>13} {'speedup':>8}")
+    for n in sizes:
+        records = synthetic_records(n)
+        t_inline = timeit(inline, records, repeat)
+        t_batch = timeit(batch, records, repeat)
+        res = {
+            "records": n,
+            "inline_us_per_record": round(t_inline / n * 1e6, 3),
+            "batch_us_per_record": round(t_batch / n * 1e6, 3),
+            "speedup": round(t_inline / t_batch, 2) if t_batch else 0,
+        }
+        print(f"{n:>8} {res['inline_us_per_record']:>14} {res['batch_us_per_record']:>13} {res['speedup']:>7}x")
+        results.append(res)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inline vs batch record normalization")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="comma separated record counts")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs per size")
+    parser.add_argument("--out", default=None, help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run([int(s) for s in args.sizes.split(",") if s], args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
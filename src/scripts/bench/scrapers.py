@@ -0,0 +1,138 @@
+"""Offline scraper benchmarks against the local fixture server.
+
+Run from src/scripts:
+
+    python -m bench.scrapers                       # all sources, all scales
+    python -m bench.scrapers --sources busx --scales 1k --out results.json
+    python -m bench.scrapers --compare bench/baseline.json
+
+Each case runs the source's Site through the engine, exactly as
+scrape_bookaway_popular_routes / scrape_busx / scrape_redbus do, in a fresh
+process so peak RSS is per case; the browser figure is the engine's
+MemoryGuard peak, summed over Chromium's whole process tree. Results are
+written as JSON; --compare exits non-zero when throughput or memory regresses past --tolerance.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import sys
+import time
+
+from bench.fixture_server import start_server
+
+# name -> (routes, trips per route); bookaway has one record per route
+SCALES = {
+    "small": (10, 10),
+    "1k": (20, 50),
+    "10k": (50, 200),
+}
+SOURCES = ("bookaway", "busx", "redbus")
+
+def _rss_mb(who):
+    kb = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_case(source, scale, base_url, concurrency, http_first):
+    """Child-process body for one (source, scale) case."""
+    os.environ["SCRAPER_FX_OFFLINE"] = "1"
+    import currency
+    currency.OFFLINE = True
+    from engine import Engine
+
+    routes, trips = SCALES[scale]
+    module = importlib.import_module(source)
+    site = module.SITE.replace(home_url=f"{base_url}/{routes}x{trips}/{source}/", rate=0)
+    max_trips = None if source == "bookaway" else trips
+
+    async def go():
+        async with Engine(site, headless=True, concurrency=concurrency, http_first=http_first) as engine:
+            start = time.perf_counter()
+            records = await engine.run(max_trips=max_trips)
+            return engine, records, time.perf_counter() - start
+
+    engine, records, wall = asyncio.run(go())
+    return {
+        "source": source,
+        "scale": scale,
+        "tier": "http" if engine.http_first else "browser",
+        "concurrency": concurrency,
+        "routes": engine.stats["routes"],
+        "trips": len(records),
+        "errors": engine.stats["errors"],
+        "wall_s": round(wall, 3),
+        "routes_per_s": round(engine.stats["routes"] / wall, 2) if wall else 0,
+        "trips_per_s": round(len(records) / wall, 2) if wall else 0,
+        "peak_rss_mb": _rss_mb(resource.RUSAGE_SELF),
+        # the driver and its whole Chromium tree, summed (see memory.worker_rss_mb)
+        "browser_peak_rss_mb": round(engine.guard.peak_mb, 1),
+        "stages": {k: {"seconds": round(v["seconds"], 4), "count": v["count"]}
+                   for k, v in engine.timings.items()},
+    }
+
+def run_all(sources, scales, concurrency=5, http_first=False):
+    server, base_url = start_server()
+    ctx = mp.get_context("spawn")
+    results = []
+    try:
+        for source in sources:
+            for scale in scales:
+                with ctx.Pool(1) as pool:
+                    res = pool.apply(run_case, (source, scale, base_url, concurrency, http_first))
+                print(f"{source:<9} {scale:<6} {res['tier']:<8} {res['trips']:>6} trips  "
+                      f"{res['wall_s']:>8.2f}s  {res['trips_per_s']:>9.1f} trips/s  "
+                      f"{res['peak_rss_mb']:>7.1f} MB py  {res['browser_peak_rss_mb']:>7.1f} MB browser")
+                results.append(res)
+    finally:
+        server.shutdown()
+    return results
+
+def compare(results, baseline, tolerance):
+    """Regressions vs a baseline results file, as human-readable strings."""
+    base = {(b["source"], b["scale"], b["tier"]): b for b in baseline.get("results", [])}
+    problems = []
+    for r in results:
+        b = base.get((r["source"], r["scale"], r["tier"]))
+        if not b:
+            continue
+        if b["trips_per_s"] and r["trips_per_s"] < b["trips_per_s"] * (1 - tolerance):
+            problems.append(f"{r['source']}/{r['scale']}/{r['tier']}: trips/s {r['trips_per_s']} < baseline {b['trips_per_s']}")
+        for key in ("peak_rss_mb", "browser_peak_rss_mb"):
+            if b.get(key) and r[key] > b[key] * (1 + tolerance):
+                problems.append(f"{r['source']}/{r['scale']}/{r['tier']}: {key} {r[key]} > baseline {b[key]}")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    parser.add_argument("--sources", default=",".join(SOURCES))
+    parser.add_argument("--scales", default=",".join(SCALES), help=f"comma separated: {', '.join(SCALES)}")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--http-first", action="store_true", help="benchmark the HTTP tier instead of the browser")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="fail if results regress against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_all([s for s in args.sources.split(",") if s], [s for s in args.scales.split(",") if s],
+                      concurrency=args.concurrency, http_first=args.http_first)
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "machine": platform.machine(), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        if problems:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,193 +1,191 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import asyncio
 import json
-import time
 import os
 import re
+from urllib.parse import urljoin
 
-def convert_usd_to_inr(price_str):
+from cli import cli_main
+from currency import get_rate
+from engine import Site, run_site, scrape_site
+from extract import extract_fields
+from metrics import timed
+from pool import CONCURRENCY
+from strategy import Strategies, candidate
+
+HOME_URL = "https://www.bookaway.com/"
+ROUTE_LINK_SELECTOR = "section.popular-routes ul.jsx-1808598477.hide-scroll.popular-route-layout a"
+ROUTE_TABLE_SELECTOR = 'table.jsx-2081236771.info-table[data-cy="route-info-table"]'
+STABLE_TABLE_SELECTOR = 'table[data-cy="route-info-table"]'
+OUTPUT_FILE = "bookaway_routes.json"
+
+def convert_usd_to_inr(price_str, rate=None):
     """Convert price from USD to INR.
-    Handles both single prices and price ranges.
+    Handles both single prices and price ranges. Async callers pass `rate`
+    so the (possibly network-bound) lookup stays off the event loop.
     """
     try:
-    
+        if rate is None:
+            with timed("fx"):
+                rate = get_rate("USD", "INR")
         if '-' in price_str:
             prices = price_str.split('-')
             converted_prices = []
             for p in prices:
                 usd = float(p.strip())
-                inr = round(usd * 87.83) 
+                inr = round(usd * rate) 
                 converted_prices.append(str(inr))
             return '-'.join(converted_prices)
         else:
             usd = float(price_str.strip())
-            return str(round(usd * 87.83)) 
+            return str(round(usd * rate)) 
     except (ValueError, TypeError):
         return price_str 
 
-def scrape_bookaway_popular_routes():
-    all_routes_data = []  
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        
-        try:
-            main_page = context.new_page()
-            main_page.goto("https://www.bookaway.com/", timeout=60000)
-            
-            try:
-                main_page.wait_for_selector("section.popular-routes", timeout=10000)
-                main_page.wait_for_selector("ul.popular-route-layout", state="visible", timeout=10000)
-            except PlaywrightTimeoutError:
-                print("⚠️ Popular routes section not found. The page might have changed structure.")
-                main_page.screenshot(path="debug_screenshot.png")
-                print("⚠️ Screenshot saved as 'debug_screenshot.png'")
-                return
-
-            route_links = main_page.query_selector_all("section.popular-routes ul.jsx-1808598477.hide-scroll.popular-route-layout a")
-            print(f"Found {len(route_links)} popular routes...")
-
-            for i, route in enumerate(route_links, 1):
-                try:
-                    href = route.get_attribute("href")
-                    if not href:
-                        print(f"[{i}/{len(route_links)}] No href found, skipping...")
-                        continue
-                    
-                    route_url = f"https://www.bookaway.com{href}"
-                    print(f"[{i}/{len(route_links)}] Processing: {route_url}")
-                    
-                    route_page = context.new_page()
-                    
-                    try:
-                        max_retries = 3
-                        for attempt in range(max_retries):
-                            try:
-                                route_page.goto(route_url, timeout=30000)
-                                route_page.wait_for_selector('table[data-cy="route-info-table"]', timeout=15000)
-                                break
-                            except Exception as e:
-                                if attempt == max_retries - 1:
-                                    raise
-                                print(f"  ⚠️  Attempt {attempt + 1} failed, retrying...")
-                                time.sleep(2)
-                        
-                        title_el = route_page.query_selector(".jsx-908685816.header")
-                        title_text = title_el.inner_text().strip() if title_el else "N/A"
-                        print(f"  Scraping: {title_text}")
-                        
-                        from_city = to_city = "N/A"
-                        if " to " in title_text.lower():
-                            from_city, to_city = [x.strip() for x in re.split(r'\s+to\s+', title_text, flags=re.IGNORECASE)]
-                            from_city = from_city.strip().capitalize()
-                            to_city = to_city.split(' Trip Overview')[0].strip().capitalize()
-                        
-                        route_table = route_page.query_selector('table.jsx-2081236771.info-table[data-cy="route-info-table"]')
-                        if not route_table:
-                            print("  ⚠️ Route info table not found")
-                            return []
-                            
-                        route_data = {
-                            "Route URL": route_url,
-                            "Title": f"{from_city} → {to_city}",
-                            "From-To": f"{from_city} → {to_city}",
-                            "From": from_city,
-                            "To": to_city,
-                            "Duration": "N/A",
-                            "Price": "N/A",
-                            "Transport Type": "Ferry",  
-                            "Operator": "N/A",
-                            "Departure Time": "N/A",
-                            "Arrival Time": "N/A"
-                        }
-                        
-                        rows = route_table.query_selector_all("tbody tr")
-                        
-                        for row in rows:
-                            try:
-                                name_el = row.query_selector(".jsx-2081236771.name")
-                                value_el = row.query_selector(".jsx-2081236771.value")
-                                
-                                if not name_el or not value_el:
-                                    continue
-                                    
-                                name = name_el.inner_text().strip()
-                                value = value_el.inner_text().strip()
-                                
-                                if "Price" in name:
-                                    price_nums = re.findall(r'\d+', value)
-                                    if price_nums:
-                                        if len(price_nums) > 1:
-                                            price_str = f"{price_nums[0]}-{price_nums[1]}"
-                                        else:
-                                            price_str = price_nums[0]
-                                        route_data["Price"] = convert_usd_to_inr(price_str)
-                                elif "Duration" in name:
-                                    route_data["Duration"] = value.replace("Ride Duration Range: ", "")
-                                elif "Earliest Departure" in name:
-                                    route_data["Departure Time"] = value
-                                elif "Latest Departure" in name:
-                                    route_data["Arrival Time"] = value
-                                elif "Most Popular Operator" in name:
-                                    operator_name = value
-                                    operator_link = value_el.query_selector("a")
-                                    if operator_link:
-                                        name_el = operator_link.query_selector(".operator-name")
-                                        if name_el:
-                                            operator_name = name_el.inner_text().strip()
-                                    route_data["Operator"] = operator_name
-                                        
-                            except Exception as e:
-                                print(f"  ⚠️ Error processing table row: {str(e)[:100]}")
-                                continue
-                        
-                        all_routes_data.append(route_data)
-                        
-                        print(f"  - Extracted data for {from_city} → {to_city}")
-                        print(f"    Price: {route_data['Price']}")
-                        print(f"    Duration: {route_data['Duration']}")
-                        print(f"    Operator: {route_data['Operator']}")
-                        print(f"    Departure: {route_data['Departure Time']}")
-                        print(f"    Arrival: {route_data['Arrival Time']}")
-                                
-                        print(f"  ✅ Successfully added route data to the collection")
-                            
-                    except Exception as e:
-                        print(f"   Error processing route: {str(e)[:100]}...")
-                        
-                        print(f"   Successfully scraped {len(route_data_list)} routes from {from_city} to {to_city}")
-                        print(f"  Total routes collected so far: {len(all_routes_data)}")
-                        
-                    except Exception as e:
-                        print(f"   Error processing route: {str(e)[:100]}...")
-                    
-                    finally:
-                        route_page.close()
-                        time.sleep(1)
-                
-                except Exception as e:
-                    print(f" Unexpected error on route {i}: {str(e)[:100]}...")
-                    continue
-            
-            # Save results
-            if all_routes_data:
-                output_file = "bookaway_routes.json"
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(all_routes_data, f, ensure_ascii=False, indent=2)
-                print(f"\n Successfully saved {len(all_routes_data)} routes to '{output_file}'")
-                print(f"File saved to: {os.path.abspath(output_file)}")
+def parse_route_title(title_text):
+    from_city = to_city = "N/A"
+    if " to " in title_text.lower():
+        from_city, to_city = [x.strip() for x in re.split(r'\s+to\s+', title_text, flags=re.IGNORECASE)]
+        from_city = from_city.strip().capitalize()
+        to_city = to_city.split(' Trip Overview')[0].strip().capitalize()
+    return from_city, to_city
+
+def new_route_data(route_url, from_city, to_city):
+    return {
+        "Route URL": route_url,
+        "Title": f"{from_city} → {to_city}",
+        "From-To": f"{from_city} → {to_city}",
+        "From": from_city,
+        "To": to_city,
+        "Duration": "N/A",
+        "Price": "N/A",
+        "Transport Type": "Ferry",  
+        "Operator": "N/A",
+        "Departure Time": "N/A",
+        "Arrival Time": "N/A"
+    }
+
+def apply_info_row(route_data, name, value, operator_name=None, rate=None):
+    """Fold one name/value row of the route info table into route_data."""
+    if "Price" in name:
+        price_nums = re.findall(r'\d+', value)
+        if price_nums:
+            if len(price_nums) > 1:
+                price_str = f"{price_nums[0]}-{price_nums[1]}"
             else:
-                print("\n  No data was scraped. Check the logs for errors.")
-                
-        except Exception as e:
-            print(f"\n Fatal error: {str(e)}")
-            
-        finally:
-        
-            if 'context' in locals():
-                context.close()
-            if 'browser' in locals():
-                browser.close()
+                price_str = price_nums[0]
+            route_data["Price"] = convert_usd_to_inr(price_str, rate)
+    elif "Duration" in name:
+        route_data["Duration"] = value.replace("Ride Duration Range: ", "")
+    elif "Earliest Departure" in name:
+        route_data["Departure Time"] = value
+    elif "Latest Departure" in name:
+        route_data["Arrival Time"] = value
+    elif "Most Popular Operator" in name:
+        route_data["Operator"] = operator_name or value
+
+def print_route_summary(route_data):
+    print(f"  - Extracted data for {route_data['From']} → {route_data['To']}")
+    print(f"    Price: {route_data['Price']}")
+    print(f"    Duration: {route_data['Duration']}")
+    print(f"    Operator: {route_data['Operator']}")
+    print(f"    Departure: {route_data['Departure Time']}")
+    print(f"    Arrival: {route_data['Arrival Time']}")
+
+def save_routes(all_routes_data, output_file=OUTPUT_FILE):
+    if all_routes_data:
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(all_routes_data, f, ensure_ascii=False, indent=2)
+        print(f"\n Successfully saved {len(all_routes_data)} routes to '{output_file}'")
+        print(f"File saved to: {os.path.abspath(output_file)}")
+    else:
+        print("\n  No data was scraped. Check the logs for errors.")
+
+async def discover_routes(main_page):
+    try:
+        await main_page.wait_for_selector("section.popular-routes", timeout=10000)
+        await main_page.wait_for_selector("ul.popular-route-layout", state="visible", timeout=10000)
+    except PlaywrightTimeoutError:
+        print("⚠️ Popular routes section not found. The page might have changed structure.")
+        await main_page.screenshot(path="debug_screenshot.png")
+        print("⚠️ Screenshot saved as 'debug_screenshot.png'")
+        return []
+
+    hrefs = await main_page.eval_on_selector_all(ROUTE_LINK_SELECTOR, "els => els.map(a => a.getAttribute('href'))")
+    return [{"url": urljoin(main_page.url, h)} for h in hrefs if h]
+
+ROW_FIELDS = {
+    "name": {"selector": ".jsx-2081236771.name", "text": "inner"},
+    "value": {"selector": ".jsx-2081236771.value", "text": "inner"},
+    "operator": {"selector": ".jsx-2081236771.value a .operator-name", "text": "inner"},
+}
+
+# without the styled-jsx hashes, in case a redeploy renames them
+STABLE_ROW_FIELDS = {
+    "name": {"selector": ".name", "text": "inner"},
+    "value": {"selector": ".value", "text": "inner"},
+    "operator": {"selector": ".value a .operator-name", "text": "inner"},
+}
+
+ROW_STRATEGIES = Strategies("bookaway", [
+    candidate("hashed", f"{ROUTE_TABLE_SELECTOR} tbody tr"),
+    candidate("data-cy", f"{STABLE_TABLE_SELECTOR} tbody tr", fields=STABLE_ROW_FIELDS),
+], ROW_FIELDS, ("name", "value"))
+
+async def extract_route(route_page, route, max_trips=None):
+    route_url = route["url"]
+    header = await extract_fields(route_page, {"title": {"selector": ".jsx-908685816.header", "text": "inner"}})
+    title_text = header["title"] or "N/A"
+    print(f"  Scraping: {title_text}")
+    from_city, to_city = parse_route_title(title_text)
+
+    rows = await ROW_STRATEGIES.extract(route_page)
+    if not rows and not await route_page.locator(STABLE_TABLE_SELECTOR).count():
+        print("  ⚠️ Route info table not found")
+        return []
+
+    with timed("fx"):
+        rate = await asyncio.to_thread(get_rate, "USD", "INR")
+    route_data = new_route_data(route_url, from_city, to_city)
+    for row in rows:
+        if not row["name"] or not row["value"]:
+            continue
+        apply_info_row(route_data, row["name"], row["value"], row["operator"] or None, rate)
+
+    print_route_summary(route_data)
+    return [route_data]
+
+SITE = Site(
+    name="bookaway",
+    home_url=HOME_URL,
+    discover=discover_routes,
+    extract=extract_route,
+    ready_selector=STABLE_TABLE_SELECTOR,
+    ready_required=True,
+    nav_timeout=30000,
+    retries=3,
+    retry_delay=2,
+    rate=1.0,
+)
+
+def scrape_bookaway_popular_routes(headless=True, max_routes=None, concurrency=1, **engine_opts):
+    """engine_opts (sink, metrics, rate, http_first, incremental, shard, guard) are passed through to the engine."""
+    all_routes_data = run_site(SITE, max_routes=max_routes, max_trips=None, headless=headless,
+                               concurrency=concurrency, **engine_opts)
+    if engine_opts.get("sink") is None:
+        save_routes(all_routes_data)
+    return all_routes_data
+
+async def scrape_bookaway_popular_routes_async(concurrency=CONCURRENCY, headless=True, max_routes=None, **engine_opts):
+    return await scrape_site(SITE, max_routes=max_routes, max_trips=None, headless=headless,
+                             concurrency=concurrency, **engine_opts)
 
 if __name__ == "__main__":
-    scrape_bookaway_popular_routes()
+    count, output = cli_main("bookaway", "Scrape Bookaway popular routes", OUTPUT_FILE,
+                             lambda **opts: scrape_bookaway_popular_routes(concurrency=CONCURRENCY, **opts),
+                             sweep=False)
+    if count:
+        print(f"\n Successfully saved {count} routes to '{output}'")
+        print(f"File saved to: {os.path.abspath(output)}")
+    else:
+        print("\n  No data was scraped. Check the logs for errors.")
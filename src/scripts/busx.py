@@ -1,14 +1,33 @@
-from playwright.sync_api import sync_playwright
-import json, time, re
+import asyncio
+import re
 from datetime import datetime, timedelta
-import requests
 
-def safe_text(el):
-    try:
-        t = el.text_content()
-        return t.strip() if t else ""
-    except:
-        return ""
+from cli import cli_main
+from currency import convert, convert_many
+from engine import Site, iter_site, run_site, scrape_site, stream_site
+from http_tier import complete, jsonld_trips
+from metrics import incr, timed
+from pool import CONCURRENCY
+from strategy import Strategies, candidate
+from sweep import with_query
+
+HOME_URL = "https://www.busx.com/en-us"
+OUTPUT_FILE = "busx_routes.json"
+CARD_SELECTOR = "div.row div.card.card-popular-route"
+TRIP_SELECTORS = [
+    "div.list-group-item.disable-choose-depart",
+    "div.list-group-item-show",
+    "div.list-group-item",
+    "div.list-info",
+    "div.card-body.block-select"
+]
+TRIP_MARKERS = ".show_name_carrier, .show_chooes_price, .select-choose-depart"
+TRIP_FALLBACK_SELECTOR = "div.card.border-0, div.list-info"
+OPERATOR_SELECTOR = ".mb-0.show_name_carrier"
+DEPARTURE_SELECTOR = ".pr-1.show-time.color-second.show_paypoint_boarding_time, .show_paypoint_boarding_time"
+ARRIVAL_SELECTOR = ".pr-1.show-time.color-second.show_paypoint_arrival_time, .show_paypoint_arrival_time"
+PRICE_SELECTOR = ".show_chooes_price, .choose_price, .show_total_price, .show_adult_price"
+DATE_PARAM = "date"  # travel date query parameter on route pages, yyyy-mm-dd
 
 def clean_price_text(txt):
     if not txt:
@@ -40,161 +59,132 @@ def compute_duration(dep, arr):
     return f"{h}h {m}m"
 
 def convert_thb_to_inr(thb_amount):
+    return convert(thb_amount, "THB", "INR")
+
+def parse_thb(thb_txt):
     try:
-        fixed = 2.3
-        resp = requests.get(
-            "https://api.exchangerate.host/convert",
-            params={'from':'THB','to':'INR','amount':thb_amount,'places':2},
-            timeout=5
-        )
-        if resp.status_code == 200:
-            j = resp.json()
-            if j.get('success') and 'result' in j:
-                return round(float(j['result']), 2)
-    except:
-        pass
-    try:
-        return round(float(thb_amount) * fixed, 2)
+        return float(clean_price_text(thb_txt))
     except:
         return 0.0
 
-def scrape_busx(max_trips=10, headless=False, max_routes=None):
-    out = []
-    with sync_playwright() as p:
-        b = p.chromium.launch(headless=headless, args=['--lang=en-US,en;q=0.9'])
-        ctx = b.new_context(locale='en-US', viewport={'width':1366,'height':768})
-        page = ctx.new_page()
-        page.set_extra_http_headers({'Accept-Language':'en-US,en;q=0.9'})
-        try:
-            page.goto("https://www.busx.com/en-us", timeout=60000, wait_until='networkidle')
-            page.wait_for_selector("div.row", timeout=15000)
-        except Exception as e:
-            try: page.close()
-            except: pass
-            try: b.close()
-            except: pass
-            return out
-
-        cards = page.query_selector_all("div.row div.card.card-popular-route")
-        if max_routes:
-            cards = cards[:max_routes]
-
-        for idx, card in enumerate(cards, start=1):
-            route_page = None
-            try:
-                title = safe_text(card.query_selector("h5.card-title"))
-                if not title:
-                    continue
-                from_to = title.replace(" - ", " → ")
-                if " - " in title:
-                    from_v, to_v = [s.strip() for s in title.split(" - ", 1)]
-                else:
-                    from_v, to_v = "", ""
-                route_url = card.evaluate("n => (n.closest ? n.closest('a') : (n.parentElement && n.parentElement.tagName === 'A' ? n.parentElement : null))?.href")
-                if not route_url:
-                    parent = card.query_selector("xpath=..")
-                    if parent:
-                        route_url = parent.get_attribute("href") or route_url
-                if not route_url:
-                    continue
-
-                route_page = ctx.new_page()
-                try:
-                    route_page.goto(route_url, timeout=60000, wait_until='domcontentloaded')
-                    route_page.wait_for_timeout(2500)
-                except:
-                    try: route_page.close()
-                    except: pass
-                    continue
-
-                trip_selectors = [
-                    "div.list-group-item.disable-choose-depart",
-                    "div.list-group-item-show",
-                    "div.list-group-item",
-                    "div.list-info",
-                    "div.card-body.block-select"
-                ]
-
-                trip_containers = []
-                for sel in trip_selectors:
-                    trip_containers = route_page.query_selector_all(sel)
-                    if trip_containers:
-                        filtered = []
-                        for c in trip_containers:
-                            if c.query_selector(".show_name_carrier") or c.query_selector(".show_chooes_price") or c.query_selector(".select-choose-depart"):
-                                filtered.append(c)
-                        trip_containers = filtered if filtered else trip_containers
-                        break
-
-                if not trip_containers:
-                    trip_containers = route_page.query_selector_all("div.card.border-0, div.list-info")
-                    if not trip_containers:
-                        try:
-                            route_page.screenshot(path=f"busx_no_trips_{idx}.png")
-                        except:
-                            pass
-                        try: route_page.close()
-                        except: pass
-                        continue
-
-                for trip in trip_containers[:max_trips]:
-                    try:
-                        operator = safe_text(trip.query_selector(".mb-0.show_name_carrier"))
-                        departure_time = safe_text(trip.query_selector(".pr-1.show-time.color-second.show_paypoint_boarding_time, .show_paypoint_boarding_time"))
-                        arrival_time = safe_text(trip.query_selector(".pr-1.show-time.color-second.show_paypoint_arrival_time, .show_paypoint_arrival_time"))
-                        price_el = trip.query_selector(".show_chooes_price, .choose_price, .show_total_price, .show_adult_price")
-
-                        thb_txt = safe_text(price_el) if price_el else ""
-                        if not thb_txt and price_el:
-                            thb_txt = price_el.get_attribute("data-show-chooes-base-price") or price_el.get_attribute("data-price") or ""
-                        thb_clean = clean_price_text(thb_txt)
-                        try:
-                            thb_val = float(thb_clean)
-                        except:
-                            thb_val = 0.0
-                        inr_val = convert_thb_to_inr(thb_val)
-
-                        duration = compute_duration(departure_time, arrival_time)
-
-                        item = {
-                            "Route URL": route_url,
-                            "Title": from_to,
-                            "From-To": from_to,
-                            "From": from_v,
-                            "To": to_v,
-                            "Duration": duration,
-                            "Price": f"{inr_val:.2f}",
-                            "Transport Type": "Bus",
-                            "Operator": operator,
-                            "Departure Time": departure_time,
-                            "Arrival Time": arrival_time
-                        }
-                        out.append(item)
-                    except:
-                        continue
-
-                try: route_page.close()
-                except: pass
-                time.sleep(1.0)
-
-            except:
-                try:
-                    if route_page:
-                        route_page.close()
-                except:
-                    pass
-                continue
-
+def split_title(title):
+    from_to = title.replace(" - ", " → ")
+    if " - " in title:
+        from_v, to_v = [s.strip() for s in title.split(" - ", 1)]
+    else:
+        from_v, to_v = "", ""
+    return from_to, from_v, to_v
+
+def make_trip_item(route_url, title, operator, departure_time, arrival_time, inr_val):
+    from_to, from_v, to_v = split_title(title)
+    return {
+        "Route URL": route_url,
+        "Title": from_to,
+        "From-To": from_to,
+        "From": from_v,
+        "To": to_v,
+        "Duration": compute_duration(departure_time, arrival_time),
+        "Price": f"{inr_val:.2f}",
+        "Transport Type": "Bus",
+        "Operator": operator,
+        "Departure Time": departure_time,
+        "Arrival Time": arrival_time
+    }
+
+async def discover_routes(page):
+    routes = await page.eval_on_selector_all(CARD_SELECTOR, """cards => cards.map(card => {
+        const t = card.querySelector('h5.card-title');
+        const a = card.closest ? card.closest('a') : (card.parentElement && card.parentElement.tagName === 'A' ? card.parentElement : null);
+        return [t ? (t.textContent || '').trim() : '', a ? a.href : ''];
+    })""")
+    return [{"url": url, "title": title} for title, url in routes if title and url]
+
+TRIP_FIELDS = {
+    "operator": OPERATOR_SELECTOR,
+    "departure": DEPARTURE_SELECTOR,
+    "arrival": ARRIVAL_SELECTOR,
+    "price": {"selector": PRICE_SELECTOR, "attrs": ["data-show-chooes-base-price", "data-price"]},
+}
+
+REQUIRED_FIELDS = ("operator", "departure", "price")
+
+TRIP_STRATEGIES = Strategies("busx", [
+    *(candidate(sel, sel, require=TRIP_MARKERS) for sel in TRIP_SELECTORS),
+    candidate("fallback", fallback=TRIP_FALLBACK_SELECTOR, drop_incomplete=True),
+], TRIP_FIELDS, REQUIRED_FIELDS)
+
+def build_items(route, trips):
+    with timed("fx"):
+        prices = convert_many([parse_thb(t["price"]) for t in trips], "THB", "INR")
+    return [make_trip_item(route["url"], route["title"], t["operator"], t["departure"], t["arrival"], inr_val)
+            for t, inr_val in zip(trips, prices)]
+
+def http_extract(html, route, max_trips=10):
+    trips = jsonld_trips(html, limit=max_trips)
+    if not complete(trips, REQUIRED_FIELDS):
+        trips = TRIP_STRATEGIES.parse(html, max_trips)
+    if not complete(trips, REQUIRED_FIELDS):
+        return []
+    return build_items(route, trips)
+
+async def stream_route(route_page, route, max_trips=10):
+    found = False
+    async for trips in TRIP_STRATEGIES.stream(route_page, max_trips):
+        found = True
+        yield await asyncio.to_thread(build_items, route, trips)
+    if not found:
         try:
-            page.close()
-            b.close()
-        except:
-            pass
-
-    return out
+            slug = re.sub(r'[^\w]+', '_', route["title"]).strip('_')
+            await route_page.screenshot(path=f"busx_no_trips_{slug}.png")
+        except Exception:
+            incr("screenshot_errors")
+        incr("empty_routes")
+
+async def extract_route(route_page, route, max_trips=10):
+    return [item async for batch in stream_route(route_page, route, max_trips) for item in batch]
+
+def date_url(url, date):
+    return with_query(url, DATE_PARAM, date)
+
+SITE = Site(
+    name="busx",
+    home_url=HOME_URL,
+    discover=discover_routes,
+    extract=extract_route,
+    stream=stream_route,
+    launch_args=['--lang=en-US,en;q=0.9'],
+    context_options={'locale': 'en-US', 'viewport': {'width': 1366, 'height': 768},
+                     'extra_http_headers': {'Accept-Language': 'en-US,en;q=0.9'}},
+    home_wait_until='networkidle',
+    home_ready_selector="div.row",
+    home_ready_required=True,
+    ready_selector=", ".join(TRIP_SELECTORS + [TRIP_FALLBACK_SELECTOR]),
+    ready_timeout=10000,
+    rate=1.0,
+    http_extract=http_extract,
+    date_url=date_url,
+)
+
+def scrape_busx(max_trips=10, headless=False, max_routes=None, concurrency=1, **engine_opts):
+    """engine_opts (sink, metrics, rate, http_first, incremental, shard, dates, budget, guard) are passed through to the engine."""
+    return run_site(SITE, max_routes=max_routes, max_trips=max_trips, headless=headless,
+                    concurrency=concurrency, **engine_opts)
+
+async def scrape_busx_async(max_trips=10, headless=False, max_routes=None, concurrency=CONCURRENCY, **engine_opts):
+    return await scrape_site(SITE, max_routes=max_routes, max_trips=max_trips, headless=headless,
+                             concurrency=concurrency, **engine_opts)
+
+def iter_busx(max_trips=10, headless=True, max_routes=None, concurrency=CONCURRENCY, **engine_opts):
+    """Trips one at a time as routes finish, e.g. for normalize.normalize_stream; stop iterating to stop scraping."""
+    return iter_site(SITE, max_routes=max_routes, max_trips=max_trips, headless=headless,
+                     concurrency=concurrency, **engine_opts)
+
+def stream_busx(max_trips=10, headless=True, max_routes=None, concurrency=CONCURRENCY, **engine_opts):
+    """Async generator version of iter_busx."""
+    return stream_site(SITE, max_routes=max_routes, max_trips=max_trips, headless=headless,
+                       concurrency=concurrency, **engine_opts)
 
 if __name__ == "__main__":
-    data = scrape_busx(max_trips=10, headless=False)
-    print(json.dumps(data, indent=2, ensure_ascii=False))
-    with open("busx_routes.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    count, output = cli_main("busx", "Scrape BusX popular routes", OUTPUT_FILE,
+                             lambda **opts: scrape_busx(max_trips=10, headless=False, concurrency=CONCURRENCY, **opts))
+    print(f"Saved {count} items to {output}")
@@ -0,0 +1,44 @@
+"""The command line shared by the site scrapers' __main__ blocks.
+
+    python busx.py --shard 2/4 --incremental --days 7 --metrics out/busx
+
+Each scraper hands cli_main its run function; the flags, sink, metrics,
+incremental store and memory guard are set up here, the same way for
+every site.
+"""
+import argparse
+
+from incremental import add_incremental_args, finish, open_sink, store_from_args
+from memory import MemoryGuard, add_memory_args, memory_opts
+from metrics import Metrics, add_metrics_args, metrics_prefix, profiled
+from shard import add_shard_args, shard_output
+from sink import add_sink_args
+from sweep import add_sweep_args, sweep_opts
+
+def cli_main(name, description, output_file, scrape, sweep=True, argv=None):
+    """Parse the common flags and call scrape(**engine_opts) into the run's sink.
+
+    engine_opts are sink, metrics, incremental, shard and guard, plus dates
+    and budget when `sweep` is set and --days is given. Returns
+    (records written, output path).
+    """
+    parser = argparse.ArgumentParser(description=description)
+    for add_args in (add_sink_args, add_metrics_args, add_incremental_args, add_shard_args, add_memory_args):
+        add_args(parser)
+    if sweep:
+        add_sweep_args(parser)
+    args = parser.parse_args(argv)
+    output = shard_output(output_file, args.shard)
+    incremental = store_from_args(args, output)
+    metrics = Metrics(name)
+    with open_sink(output, args.resume, incremental) as sink:
+        opts = {"sink": sink, "metrics": metrics, "incremental": incremental, "shard": args.shard,
+                "guard": MemoryGuard(**memory_opts(args))}
+        if sweep:
+            opts.update(sweep_opts(args))
+        if args.profile:
+            profiled(scrape, args.profile, **opts)
+        else:
+            scrape(**opts)
+    metrics.write(args.metrics or metrics_prefix(output), {"routes": len(sink.done), "trips": sink.records})
+    return finish(sink.path, output, incremental), output
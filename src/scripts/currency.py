@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+# 1 unit = X INR; used when every rate API is unreachable
+FALLBACK_RATES = {
+    "USD": 87.83,
+    "EUR": 91.76,
+    "GBP": 112.00,
+    "THB": 2.3,
+    "MAD": 9.71,
+    "INR": 1,
+}
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fx_cache.json")
+CACHE_TTL = 12 * 3600
+API_TIMEOUT = 5
+# never touch the network, e.g. for offline benchmarks
+OFFLINE = os.environ.get("SCRAPER_FX_OFFLINE") == "1"
+
+_rates = {}
+_lock = threading.Lock()
+_session = None
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+def _load_disk_cache():
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_disk_cache(key, rate):
+    cache = _load_disk_cache()
+    cache[key] = {"rate": rate, "ts": time.time()}
+    try:
+        tmp = CACHE_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, CACHE_FILE)
+    except OSError:
+        pass
+
+def _fetch_rate(src, dst):
+    if OFFLINE:
+        return None
+    session = _get_session()
+    try:
+        resp = session.get(f"https://api.exchangerate-api.com/v4/latest/{src}", timeout=API_TIMEOUT)
+        if resp.status_code == 200:
+            rate = resp.json().get("rates", {}).get(dst)
+            if rate:
+                return float(rate)
+    except (requests.RequestException, ValueError):
+        pass
+    try:
+        resp = session.get("https://api.exchangerate.host/convert",
+                           params={'from': src, 'to': dst, 'amount': 1}, timeout=API_TIMEOUT)
+        if resp.status_code == 200:
+            j = resp.json()
+            if j.get('success') and j.get('result'):
+                return float(j['result'])
+    except (requests.RequestException, ValueError):
+        pass
+    return None
+
+def _fallback_rate(src, dst):
+    try:
+        return FALLBACK_RATES[src] / FALLBACK_RATES[dst]
+    except KeyError:
+        return None
+
+def get_rate(src, dst="INR", ttl=CACHE_TTL):
+    """Rate for 1 `src` in `dst`.
+    Looked up in memory, then the on-disk cache (if younger than ttl), then
+    the rate APIs, then FALLBACK_RATES. Each pair hits the network at most
+    once per process.
+    """
+    src, dst = src.upper(), dst.upper()
+    if src == dst:
+        return 1.0
+    key = f"{src}_{dst}"
+    with _lock:
+        if key in _rates:
+            return _rates[key]
+        entry = None if OFFLINE else _load_disk_cache().get(key)
+        if entry and time.time() - entry.get("ts", 0) < ttl:
+            rate = entry["rate"]
+        else:
+            rate = _fetch_rate(src, dst)
+            if rate:
+                _save_disk_cache(key, rate)
+            else:
+                rate = _fallback_rate(src, dst)
+                if rate:
+                    print(f"⚠️ Using fallback rate for {src} (1 {src} = {rate} {dst})")
+        _rates[key] = rate
+        return rate
+
+def convert(amount, src, dst="INR", places=2):
+    rate = get_rate(src, dst)
+    try:
+        return round(float(amount) * rate, places)
+    except (TypeError, ValueError):
+        return 0.0
+
+def convert_many(amounts, src, dst="INR", places=2):
+    """Convert a batch of amounts with a single rate lookup; bad values become 0.0."""
+    rate = get_rate(src, dst)
+    out = []
+    for amount in amounts:
+        try:
+            out.append(round(float(amount) * rate, places))
+        except (TypeError, ValueError):
+            out.append(0.0)
+    return out
+
+def clear():
+    with _lock:
+        _rates.clear()
@@ -0,0 +1,263 @@
+"""Long-running scrape daemon that keeps one warm browser per source.
+
+    python daemon.py --port 8765                 # HTTP on 127.0.0.1
+    python daemon.py --socket /tmp/scraper.sock  # HTTP over a Unix socket
+
+Jobs are POSTed as JSON and the records are streamed back as NDJSON, one
+line per finished route, followed by a final {"done": true, ...} line:
+
+    curl -N -d '{"source": "busx", "max_trips": 5, "priority": 1}' localhost:8765/jobs
+    curl -N --unix-socket /tmp/scraper.sock -d '{"source": "redbus", "routes": ["https://..."]}' http://x/jobs
+
+Job fields: source (required), routes (subset of route URLs), max_routes,
+max_trips, priority (lower runs first, default 10), refresh (reload the
+home page instead of using the cached route list). GET /status reports the
+queues, warm engines and route-list cache ages.
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import time
+
+from engine import Engine
+from metrics import Metrics
+from pool import CONCURRENCY
+from run import SOURCES
+
+ROUTES_TTL = 1800
+DEFAULT_PRIORITY = 10
+MAX_BODY = 1 << 20
+
+class Job:
+    def __init__(self, spec):
+        self.source = spec["source"]
+        self.routes = spec.get("routes")
+        self.max_routes = spec.get("max_routes")
+        self.max_trips = spec.get("max_trips", SOURCES[self.source]["max_trips"])
+        self.priority = int(spec.get("priority", DEFAULT_PRIORITY))
+        self.refresh = bool(spec.get("refresh"))
+        self.out = asyncio.Queue()
+        self.created = time.monotonic()
+
+    # Engine sink protocol: every finished route is streamed to the client
+    def is_done(self, route_url):
+        return False
+
+    def write_route(self, route_url, records):
+        self.out.put_nowait({"route": route_url, "records": records})
+
+class SourceWorker:
+    """Warm engine, cached route list and priority job queue for one source."""
+
+    def __init__(self, source, headless=True, concurrency=CONCURRENCY, ttl=ROUTES_TTL):
+        self.source = source
+        self.site = importlib.import_module(SOURCES[source]["module"]).SITE
+        self.headless = headless
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.queue = asyncio.PriorityQueue()
+        self.engine = None
+        self.routes = None
+        self.routes_at = 0.0
+        self.running = None
+        self.jobs_done = 0
+        self._seq = itertools.count()
+        self._task = None
+
+    def submit(self, job):
+        self.queue.put_nowait((job.priority, next(self._seq), job))
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _ensure_engine(self):
+        if self.engine is None:
+            self.engine = await Engine(self.site, headless=self.headless, concurrency=self.concurrency,
+                                       metrics=Metrics(self.source)).__aenter__()
+            print(f"[daemon] {self.source}: browser warm")
+        return self.engine
+
+    async def _discard_engine(self):
+        engine, self.engine = self.engine, None
+        if engine is None:
+            return
+        try:
+            await engine.__aexit__(None, None, None)
+        except Exception:
+            pass
+        print(f"[daemon] {self.source}: browser closed after a failed job, relaunching on the next one")
+
+    async def route_list(self, refresh=False):
+        engine = await self._ensure_engine()
+        if refresh or self.routes is None or time.monotonic() - self.routes_at > self.ttl:
+            routes = await engine.discover()
+            if routes or self.routes is None:
+                self.routes, self.routes_at = routes, time.monotonic()
+            print(f"[daemon] {self.source}: route list refreshed ({len(self.routes)} routes)")
+        return self.routes
+
+    async def run_job(self, job):
+        engine = await self._ensure_engine()
+        routes = await self.route_list(job.refresh)
+        if job.routes:
+            wanted = set(job.routes)
+            known = {r["url"] for r in routes}
+            routes = [r for r in routes if r["url"] in wanted]
+            # URLs missing from the home page are still tried; only the URL is known for them
+            routes += [{"url": u, "title": ""} for u in job.routes if u not in known]
+        before = dict(engine.stats)
+        await engine.run(max_routes=job.max_routes, max_trips=job.max_trips, sink=job, routes=routes)
+        return {k: engine.stats[k] - before.get(k, 0) for k in engine.stats}
+
+    async def _loop(self):
+        while True:
+            _, _, job = await self.queue.get()
+            self.running = job
+            summary = {"done": True, "source": self.source}
+            try:
+                summary.update(await self.run_job(job))
+            except Exception as e:
+                # route errors are handled inside engine.run: what gets here is the browser
+                # itself (crashed, over the memory cap, ...), so start the next job on a fresh one
+                summary["error"] = str(e)[:200]
+                await self._discard_engine()
+            summary["seconds"] = round(time.monotonic() - job.created, 2)
+            job.out.put_nowait(summary)
+            self.running = None
+            self.jobs_done += 1
+
+    def status(self):
+        return {
+            "warm": self.engine is not None,
+            "queued": self.queue.qsize(),
+            "running": self.running is not None,
+            "jobs_done": self.jobs_done,
+            "routes_cached": len(self.routes) if self.routes is not None else None,
+            "routes_age_s": round(time.monotonic() - self.routes_at, 1) if self.routes is not None else None,
+            "stats": dict(self.engine.stats) if self.engine else None,
+            "memory": self.engine.guard.summary() if self.engine else None,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self.engine is not None:
+            await self.engine.__aexit__(None, None, None)
+
+class Daemon:
+    def __init__(self, headless=True, concurrency=CONCURRENCY, ttl=ROUTES_TTL):
+        self.workers = {s: SourceWorker(s, headless, concurrency, ttl) for s in SOURCES}
+        self.started = time.monotonic()
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, body = await _read_request(reader)
+            if method == "GET" and path == "/status":
+                await _respond(writer, 200, self.status())
+            elif method == "POST" and path == "/jobs":
+                await self.handle_job(body, writer)
+            else:
+                await _respond(writer, 404, {"error": f"no route for {method} {path}"})
+        except ValueError as e:
+            await _respond(writer, 400, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def handle_job(self, body, writer):
+        try:
+            spec = json.loads(body or b"{}")
+        except ValueError:
+            raise ValueError("job body must be JSON")
+        if not isinstance(spec, dict):
+            raise ValueError("job body must be a JSON object")
+        if spec.get("source") not in self.workers:
+            raise ValueError(f"source must be one of: {', '.join(self.workers)}")
+        job = Job(spec)
+        self.workers[job.source].submit(job)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        while True:
+            item = await job.out.get()
+            line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+            if item.get("done"):
+                break
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def status(self):
+        return {"uptime_s": round(time.monotonic() - self.started, 1),
+                "sources": {s: w.status() for s, w in self.workers.items()}}
+
+    async def close(self):
+        for w in self.workers.values():
+            try:
+                await w.close()
+            except Exception:
+                pass
+
+async def _read_request(reader):
+    line = await reader.readline()
+    parts = line.decode("latin-1").split()
+    if len(parts) < 2:
+        raise ValueError("bad request line")
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return parts[0].upper(), parts[1].split("?")[0], body
+
+async def _respond(writer, status, obj):
+    body = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(status, "")
+    writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+
+async def serve(host="127.0.0.1", port=8765, socket_path=None, **opts):
+    daemon = Daemon(**opts)
+    if socket_path:
+        server = await asyncio.start_unix_server(daemon.handle, path=socket_path)
+        print(f"[daemon] listening on unix:{socket_path}")
+    else:
+        server = await asyncio.start_server(daemon.handle, host, port)
+        print(f"[daemon] listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await daemon.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm-browser scrape daemon with a local job API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="route pages in flight per source")
+    parser.add_argument("--routes-ttl", type=float, default=ROUTES_TTL / 60,
+                        help="minutes before a cached home-page route list is reloaded")
+    parser.add_argument("--headful", action="store_true", help="show the browser windows")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket, headless=not args.headful,
+                          concurrency=args.concurrency, ttl=args.routes_ttl * 60))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
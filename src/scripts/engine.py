@@ -0,0 +1,657 @@
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import asyncio
+import copy
+import queue
+import threading
+import time
+
+from http_tier import fetch_html, parser_available
+from memory import MemoryCapExceeded, MemoryGuard
+from metrics import Metrics, activate
+from netpolicy import AssetCache, NetworkPolicy
+from pool import CONCURRENCY, PagePool, gather_bounded, flatten
+from ratelimit import host_of, throttle
+from resilience import CircuitBreaker, backoff_delay, health, report as host_report
+from shard import shard_routes
+from sweep import Sweep, estimate_seconds
+
+RESCHEDULE_ROUNDS = 3
+# after this many HTTP attempts in a row fall back to the browser, the HTTP
+# tier is only sampled on one route in HTTP_SAMPLE_EVERY (client-rendered sites)
+HTTP_GIVE_UP = 5
+HTTP_SAMPLE_EVERY = 25
+STREAM_BUFFER = 1000  # trips iter_site may hold ahead of its consumer
+ROUTE_FAILED = object()  # scrape_route: the page errored, as opposed to loading with no trips
+
+class Site:
+    """Everything the engine needs to know about one source.
+
+    discover(page) runs on the loaded home page and returns a list of route
+    dicts (at least {"url": ...}); extract(page, route, max_trips) runs on a
+    loaded route page and returns the records for that route. When the site
+    sets stream(page, route, max_trips), an async generator over batches of
+    records (e.g. one per scroll of a lazy-loaded list), the engine uses it
+    instead and closes it as soon as max_trips records are in.
+
+    A page counts as ready once ready_selector shows up, or at network idle
+    when there is no selector, waiting at most ready_timeout ms. Requests to
+    the site's host are paced at `rate` per second (burst `burst`).
+    Navigation is retried `retries` times with jittered exponential backoff
+    from `retry_delay` seconds; nav_timeout is the ceiling of the adaptive
+    per-host timeout (see resilience.py).
+
+    http_extract(html, route, max_trips), when set, is tried first on the raw
+    HTML over plain HTTP and should return no records when required fields
+    are missing, so the engine falls back to the browser.
+
+    date_url(url, date), when set, returns the route page URL for an ISO
+    travel date, which lets the site be swept over several dates.
+
+    Images, media, fonts and trackers are blocked and static JS/CSS comes
+    from the shared asset cache (see netpolicy.py) unless block_resources is
+    off; URLs matching an allow_urls regex are always loaded untouched.
+    """
+
+    def __init__(self, name, home_url, discover, extract,
+                 launch_args=None, context_options=None,
+                 home_wait_until='domcontentloaded', home_ready_selector=None, home_ready_required=False,
+                 wait_until='domcontentloaded', ready_selector=None, ready_required=False, ready_timeout=15000,
+                 nav_timeout=60000, retries=3, retry_delay=2, rate=1.0, burst=1, http_extract=None, date_url=None,
+                 block_resources=True, allow_urls=(), stream=None):
+        self.name = name
+        self.home_url = home_url
+        self.discover = discover
+        self.extract = extract
+        self.launch_args = launch_args or []
+        self.context_options = context_options or {}
+        self.home_wait_until = home_wait_until
+        self.home_ready_selector = home_ready_selector
+        self.home_ready_required = home_ready_required
+        self.wait_until = wait_until
+        self.ready_selector = ready_selector
+        self.ready_required = ready_required
+        self.ready_timeout = ready_timeout
+        self.nav_timeout = nav_timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.rate = rate
+        self.burst = burst
+        self.http_extract = http_extract
+        self.date_url = date_url
+        self.block_resources = block_resources
+        self.allow_urls = tuple(allow_urls)
+        self.stream = stream
+
+    def replace(self, **changes):
+        """Copy of this site with some settings overridden (e.g. home_url for fixtures)."""
+        site = copy.copy(self)
+        for k, v in changes.items():
+            if not hasattr(site, k):
+                raise AttributeError(f"Site has no setting {k!r}")
+            setattr(site, k, v)
+        return site
+
+async def dispose(handle):
+    """Release an ElementHandle (or JSHandle) now instead of when its page goes away."""
+    if handle is not None:
+        try:
+            await handle.dispose()
+        except Exception:
+            pass
+
+async def wait_ready(page, selector=None, timeout=15000, required=False):
+    """Wait for content instead of sleeping: the selector if given, else network idle.
+    Returns False on timeout unless `required`, in which case it raises.
+    """
+    try:
+        if selector:
+            await dispose(await page.wait_for_selector(selector, timeout=timeout))
+        else:
+            await page.wait_for_load_state('networkidle', timeout=timeout)
+        return True
+    except Exception:
+        if required:
+            raise
+        return False
+
+def _driver_pid(pw):
+    """Pid of the Playwright driver process (parent of this engine's Chromium), or None."""
+    try:
+        return pw._impl_obj._connection._transport._proc.pid
+    except AttributeError:
+        return None
+
+def _mb(value):
+    return "?" if value is None else f"{value:.0f}"
+
+class Engine:
+    """One Chromium instance, one context and a pool of warm pages for a site.
+
+    The context is recycled (and if need be the browser relaunched) between
+    pages when the MemoryGuard says so; see memory.py.
+    """
+
+    def __init__(self, site, headless=True, concurrency=CONCURRENCY, rate=None, http_first=True, metrics=None,
+                 incremental=None, network=True, asset_cache=None, guard=None):
+        self.site = site
+        self.headless = headless
+        self.concurrency = max(1, int(concurrency or 1))
+        self.rate = rate or site.rate
+        self.http_first = http_first and site.http_extract is not None and parser_available()
+        self.tiers = {"http": 0, "browser": 0}
+        self._http_misses = 0
+        self._http_skipped = 0
+        self.stats = {"routes": 0, "trips": 0, "errors": 0}
+        self.metrics = metrics or Metrics(site.name)
+        self.incremental = incremental
+        self.network = network and site.block_resources
+        self.policy = None
+        self.asset_cache = asset_cache
+        self.guard = guard or MemoryGuard()
+        self._pw = None
+        self.browser = None
+        self.context = None
+        self.pool = None
+        self._recycling = asyncio.Lock()
+        self._watch = None
+
+    async def __aenter__(self):
+        try:
+            self._pw = await async_playwright().start()
+            self.guard.pid = _driver_pid(self._pw)
+            self.browser = await self._launch()
+            if self.network:
+                cache = self.asset_cache if self.asset_cache is not None else AssetCache()
+                self.policy = NetworkPolicy(allow=self.site.allow_urls, cache=cache, metrics=self.metrics)
+            self.context = await self._new_context()
+            self.pool = await PagePool(self.context, self.concurrency).open()
+        except BaseException:
+            # __aexit__ does not run when __aenter__ raises: don't leave the driver behind
+            await self._close()
+            raise
+        self._watch = asyncio.create_task(self.guard.watch())
+        return self
+
+    async def _launch(self):
+        return await self._pw.chromium.launch(headless=self.headless, args=self.site.launch_args)
+
+    async def _new_context(self):
+        context = await self.browser.new_context(**self.site.context_options)
+        context.on("requestfinished", self._count_bytes)
+        if self.policy is not None:
+            await self.policy.install(context)
+        return context
+
+    async def _acquire(self):
+        """A pool page, after recycling the context if the memory guard asks for it."""
+        if self.guard.due():
+            async with self._recycling:
+                reason = self.guard.due()
+                if reason:
+                    await self._recycle(reason)
+        page = await self.pool.acquire()
+        self.guard.page()
+        return page
+
+    async def _recycle(self, reason):
+        """Close every page and the context once the pages in flight are done,
+        relaunch the browser if that did not bring memory under recycle_mb,
+        and give up with MemoryCapExceeded if it is still above the cap."""
+        guard, name = self.guard, self.site.name
+        before = guard.last_mb
+        await self.pool.drain()
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+        guard.stats["recycles"] += 1
+        self.metrics.incr("context_recycles")
+        await asyncio.to_thread(guard.sample)
+        if guard.above_recycle():
+            try:
+                await self.browser.close()
+            except Exception:
+                pass
+            self.browser = await self._launch()
+            guard.stats["relaunches"] += 1
+            self.metrics.incr("browser_relaunches")
+            await asyncio.to_thread(guard.sample)
+        if guard.above_cap():
+            self.metrics.incr("memory_cap_hits")
+            raise MemoryCapExceeded(f"[{name}] worker RSS {guard.last_mb:.0f} MB is above the "
+                                    f"{guard.cap_mb} MB cap even with a fresh browser")
+        print(f"[{name}] Recycled browser context after {guard.pages} pages ({reason}): "
+              f"{_mb(before)} -> {_mb(guard.last_mb)} MB")
+        guard.recycled()
+        self.context = await self._new_context()
+        self.pool.context = self.context
+        await self.pool.open()
+
+    async def __aexit__(self, *exc):
+        if self._watch is not None:
+            self._watch.cancel()
+        self.guard.sample()
+        m = self.guard.summary()
+        print(f"[{self.site.name}] Memory: peak {m['peak_mb']} MB over {m['pages']} pages, "
+              f"{m['recycles']} context recycles, {m['relaunches']} browser relaunches")
+        if self.policy is not None:
+            print(f"[{self.site.name}] Network policy: {self.policy.summary()}")
+        await self._close()
+
+    async def _close(self):
+        """Close whatever has been opened so far, innermost first."""
+        if self.policy is not None:
+            try:
+                self.policy.close()
+            except OSError:
+                pass
+            self.policy = None
+        for name in ("pool", "context", "browser", "_pw"):
+            obj = getattr(self, name)
+            if obj is None:
+                continue
+            try:
+                await (obj.stop() if name == "_pw" else obj.close())
+            except Exception:
+                pass
+            setattr(self, name, None)
+
+    def timed(self, stage):
+        return self.metrics.timed(stage)
+
+    @property
+    def timings(self):
+        return self.metrics.timings()
+
+    async def _count_bytes(self, request):
+        if self.policy is not None and request.url in self.policy.served:
+            return
+        try:
+            sizes = await request.sizes()
+            self.metrics.add_bytes("browser", sizes["responseBodySize"] + sizes["responseHeadersSize"])
+        except Exception:
+            pass
+
+    def _error(self, kind, e):
+        self.stats["errors"] += 1
+        self.metrics.incr(kind)
+        if isinstance(e, PlaywrightTimeoutError):
+            self.metrics.incr("timeouts")
+
+    async def discover(self):
+        site = self.site
+        page = await self._acquire()
+        broken = False
+        try:
+            with self.timed("discover"):
+                await throttle(site.home_url, self.rate, site.burst)
+                await page.goto(site.home_url, timeout=60000, wait_until=site.home_wait_until)
+                if site.home_ready_selector:
+                    if not await wait_ready(page, site.home_ready_selector, site.ready_timeout, site.home_ready_required):
+                        self.metrics.incr("ready_timeouts")
+                return await site.discover(page) or []
+        except Exception as e:
+            broken = True
+            self._error("discover_errors", e)
+            print(f"[{site.name}] Failed to load home page: {str(e)[:100]}")
+            return []
+        finally:
+            await self.pool.release(page, broken)
+
+    async def load(self, page, url):
+        site = self.site
+        latency = health(url).latency
+        timeout = latency.timeout_ms(site.nav_timeout)
+        for attempt in range(site.retries):
+            try:
+                with self.timed("throttle"):
+                    await throttle(url, self.rate, site.burst)
+                with self.timed("navigate"):
+                    start = time.perf_counter()
+                    resp = await page.goto(url, timeout=timeout, wait_until=site.wait_until)
+                    latency.observe(time.perf_counter() - start)
+                with self.timed("ready"):
+                    if not await wait_ready(page, site.ready_selector, site.ready_timeout, site.ready_required):
+                        self.metrics.incr("ready_timeouts")
+                return resp
+            except Exception as e:
+                if attempt == site.retries - 1:
+                    raise
+                self.metrics.incr("retries")
+                if isinstance(e, PlaywrightTimeoutError):
+                    self.metrics.incr("timeouts")
+                    # the adaptive timeout may just be too tight for this page
+                    timeout = min(site.nav_timeout, timeout * 2)
+                delay = backoff_delay(attempt, site.retry_delay)
+                self.metrics.incr("backoff_ms", int(delay * 1000))
+                print(f"  ⚠️  Attempt {attempt + 1} failed, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    def _fetch_and_parse(self, route, max_trips):
+        headers = self.site.context_options.get("extra_http_headers")
+        resp = fetch_html(route["url"], headers=headers)
+        self.metrics.add_bytes("http", len(resp.content))
+        records = self.site.http_extract(resp.text, route, max_trips) or []
+        if records and self.incremental is not None:
+            self.incremental.saw_headers(route["url"], resp.headers)
+        return records
+
+    async def scrape_http(self, route, max_trips):
+        try:
+            with self.timed("throttle"):
+                await throttle(route["url"], self.rate, self.site.burst)
+            with self.timed("http"):
+                return await asyncio.to_thread(self._fetch_and_parse, route, max_trips)
+        except Exception:
+            self.metrics.incr("http_errors")
+            return []
+
+    def _tag(self, records, tier):
+        if records:
+            self.tiers[tier] += 1
+        for rec in records:
+            rec["Tier"] = tier
+        return records
+
+    def _try_http(self):
+        if not self.http_first:
+            return False
+        if self._http_misses < HTTP_GIVE_UP:
+            return True
+        self._http_skipped += 1
+        return self._http_skipped % HTTP_SAMPLE_EVERY == 0
+
+    async def scrape_route(self, i, route, max_trips):
+        """Records for one route, None when its host's circuit breaker is
+        open and the route should be rescheduled, or ROUTE_FAILED when it errored."""
+        breaker = health(route["url"]).breaker
+        if not breaker.allow():
+            self.metrics.incr("breaker_deferred")
+            return None
+        if self._try_http():
+            records = await self.scrape_http(route, max_trips)
+            if records:
+                self._http_misses = 0
+                breaker.success()
+                return self._tag(records, "http")
+            self.metrics.incr("http_fallbacks")
+            self._http_misses += 1
+            if self._http_misses == HTTP_GIVE_UP:
+                self.metrics.incr("http_disabled")
+                print(f"[{self.site.name}] {HTTP_GIVE_UP} routes in a row needed the browser: "
+                      f"trying HTTP on 1 route in {HTTP_SAMPLE_EVERY} from now on")
+
+        site = self.site
+        page = await self._acquire()
+        broken = False
+        try:
+            await self.load(page, route["url"])
+            if self.incremental is not None:
+                self.incremental.no_validators(route["url"])
+            with self.timed("extract"):
+                if site.stream is not None:
+                    records = await self._collect(site.stream(page, route, max_trips), max_trips)
+                else:
+                    records = await site.extract(page, route, max_trips) or []
+            breaker.success()
+            return self._tag(records, "browser")
+        except Exception as e:
+            broken = page.is_closed()
+            if breaker.failure():
+                self.metrics.incr("breaker_opens")
+                print(f"[{site.name}] Circuit open for {host_of(route['url'])}: "
+                      f"pausing it for {breaker.retry_in():.0f}s")
+            if breaker.state != CircuitBreaker.CLOSED:
+                self.metrics.incr("rescheduled")
+                return None
+            self._error("route_errors", e)
+            print(f"[{site.name}] Error on route {i} ({route['url']}): {str(e)[:100]}")
+            return ROUTE_FAILED
+        finally:
+            await self.pool.release(page, broken)
+
+    async def _collect(self, batches, max_trips):
+        """Drain a site's stream, stopping it once max_trips records are in."""
+        records = []
+        try:
+            async for batch in batches:
+                records.extend(batch)
+                if max_trips and len(records) >= max_trips:
+                    break
+        finally:
+            await batches.aclose()
+        return records[:max_trips] if max_trips else records
+
+    async def _skip_unchanged(self, routes):
+        """Drop routes checked within the freshness window or answering 304 to a conditional GET."""
+        inc = self.incremental
+        stale = [r for r in routes if not inc.is_fresh(r["url"])]
+        inc.stats["fresh"] += len(routes) - len(stale)
+        headers = self.site.context_options.get("extra_http_headers")
+
+        async def probe(i, route):
+            if route["url"] not in inc.routes:
+                return False
+            with self.timed("throttle"):
+                await throttle(route["url"], self.rate, self.site.burst)
+            with self.timed("probe"):
+                return await asyncio.to_thread(inc.probe, route["url"], headers)
+
+        hits = await gather_bounded(stale, probe, self.concurrency)
+        inc.stats["not_modified"] += sum(hits)
+        self.metrics.incr("fresh_skips", len(routes) - len(stale))
+        self.metrics.incr("not_modified_skips", sum(hits))
+        todo = [r for r, hit in zip(stale, hits) if not hit]
+        print(f"[{self.site.name}] Incremental: {len(routes) - len(todo)} of {len(routes)} routes unchanged, skipped")
+        return todo
+
+    def _sweep(self, routes, dates, budget):
+        if self.site.date_url is None:
+            raise ValueError(f"{self.site.name} has no date_url, it cannot be swept over dates")
+        sweep = Sweep(dates, budget=budget)
+        jobs = sweep.jobs(routes, self.site.date_url)
+        eta = estimate_seconds(len(jobs), self.rate, self.concurrency)
+        print(f"[{self.site.name}] Sweeping {len(routes)} routes x {len(dates)} dates = {len(jobs)} pages, "
+              f"estimated {eta / 60:.1f} min" + (f", budget {budget / 60:.1f} min" if budget else ""))
+        return sweep, jobs
+
+    async def _reschedule(self, deferred, worker):
+        """Retry routes deferred by an open circuit breaker once it cools down:
+        one route first as the probe, then the rest."""
+        chunks = []
+        for round_no in range(1, RESCHEDULE_ROUNDS + 1):
+            if not deferred:
+                break
+            todo = list(deferred)
+            deferred.clear()
+            wait = max(health(r["url"]).breaker.retry_in() for r in todo)
+            print(f"[{self.site.name}] Rescheduling {len(todo)} routes in {wait:.0f}s (round {round_no})")
+            await asyncio.sleep(wait)
+            chunks += await gather_bounded(todo[:1], worker, 1)
+            chunks += await gather_bounded(todo[1:], worker, self.concurrency)
+        if deferred:
+            self.stats["errors"] += len(deferred)
+            self.metrics.incr("route_errors", len(deferred))
+            print(f"[{self.site.name}] Gave up on {len(deferred)} routes from failing hosts")
+        for host, h in host_report().items():
+            if h["opens"]:
+                print(f"[{self.site.name}] {host}: breaker {h['breaker']}, opened {h['opens']}x, "
+                      f"nav p95 {h['nav_p95_s']}s")
+        return chunks
+
+    async def run(self, max_routes=None, max_trips=10, sink=None, dates=None, budget=None, routes=None, shard=None,
+                  emit=None):
+        """Scrape every discovered route.
+        With a sink, each route's records are streamed to it as soon as the
+        route finishes and are not kept in memory; routes the sink already
+        has are skipped and the return value is empty. With an incremental
+        FingerprintStore, unchanged routes are skipped and only each route's
+        delta (added/changed/removed trips) is returned or streamed.
+        With `dates`, every route is scraped once per travel date (see sweep.py),
+        records carry a "Date" field and `budget` caps the sweep in seconds.
+        Passing `routes` skips home-page discovery (e.g. a cached route list);
+        shard=(i, n) keeps only the routes whose URL hashes to shard i, out of
+        the first max_routes.
+        `emit`, an async callback, gets each route's records instead of the
+        return value (see stream()).
+        """
+        activate(self.metrics)
+        if routes is None:
+            routes = await self.discover()
+        # cap first, so the shards split the same route list an unsharded run covers
+        if max_routes:
+            routes = routes[:max_routes]
+        if shard:
+            found = len(routes)
+            routes = shard_routes(routes, shard)
+            print(f"[{self.site.name}] Shard {shard[0]}/{shard[1]}: {len(routes)} of {found} routes")
+        print(f"[{self.site.name}] Found {len(routes)} routes...")
+        sweep = None
+        if dates:
+            sweep, routes = self._sweep(routes, dates, budget)
+        if sink is not None:
+            todo = [r for r in routes if not sink.is_done(r["url"])]
+            if len(todo) < len(routes):
+                print(f"[{self.site.name}] Resuming: {len(routes) - len(todo)} routes already done")
+            routes = todo
+        if self.incremental is not None:
+            routes = await self._skip_unchanged(routes)
+
+        deferred = []
+
+        async def worker(i, route):
+            if sweep is not None and not sweep.should_run(route):
+                return []
+            start = time.perf_counter()
+            records = await self.scrape_route(i, route, max_trips)
+            if records is None:
+                deferred.append(route)
+                return []
+            failed = records is ROUTE_FAILED
+            if failed:
+                records = []
+            if sweep is not None:
+                records = sweep.finished(route, records, failed)
+            if self.incremental is not None:
+                records = self.incremental.update(route["url"], records)
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("route", elapsed)
+            self.metrics.route_done(route["url"], elapsed)
+            self.stats["routes"] += 1
+            self.stats["trips"] += len(records)
+            if sink is not None:
+                sink.write_route(route["url"], records)
+            if emit is not None and records:
+                await emit(records)
+            return records if sink is None and emit is None else []
+
+        if sweep is not None:
+            sweep.start()
+        chunks = await gather_bounded(routes, worker, self.concurrency)
+        chunks += await self._reschedule(deferred, worker)
+        if sweep is not None:
+            print(f"[{self.site.name}] Sweep: {sweep.summary()}")
+            for key in ("empty", "failed", "exhausted_skips", "budget_skips"):
+                self.metrics.incr(f"sweep_{key}", sweep.stats[key])
+        if self.http_first:
+            print(f"[{self.site.name}] Routes served over HTTP: {self.tiers['http']}, via browser: {self.tiers['browser']}")
+        return flatten(chunks)
+
+    async def stream(self, **run_args):
+        """Async generator over the trips of run(**run_args), route by route as
+        each one finishes. At most `concurrency` finished routes wait for the
+        consumer, so workers pause when it falls behind; when it stops
+        iterating, the run is cancelled."""
+        pending = asyncio.Queue(maxsize=self.concurrency)
+
+        async def produce():
+            try:
+                await self.run(emit=pending.put, **run_args)
+            except Exception as e:
+                await pending.put(e)
+            else:
+                await pending.put(None)
+
+        task = asyncio.create_task(produce())
+        try:
+            while True:
+                records = await pending.get()
+                if records is None:
+                    break
+                if isinstance(records, Exception):
+                    raise records
+                for rec in records:
+                    yield rec
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+async def scrape_site(site, max_routes=None, max_trips=10, headless=True, concurrency=CONCURRENCY, rate=None, sink=None,
+                      http_first=True, metrics=None, incremental=None, dates=None, budget=None, shard=None,
+                      network=True, guard=None):
+    async with Engine(site, headless=headless, concurrency=concurrency, rate=rate, http_first=http_first,
+                      metrics=metrics, incremental=incremental, network=network, guard=guard) as engine:
+        return await engine.run(max_routes=max_routes, max_trips=max_trips, sink=sink, dates=dates, budget=budget,
+                                shard=shard)
+
+def run_site(site, **kwargs):
+    """Blocking entry point; concurrency=1 gives the old one-route-at-a-time behaviour."""
+    return asyncio.run(scrape_site(site, **kwargs))
+
+async def stream_site(site, max_routes=None, max_trips=10, headless=True, concurrency=CONCURRENCY, rate=None,
+                      http_first=True, metrics=None, incremental=None, dates=None, budget=None, shard=None,
+                      network=True, guard=None):
+    """scrape_site as an async generator of trips (see Engine.stream)."""
+    async with Engine(site, headless=headless, concurrency=concurrency, rate=rate, http_first=http_first,
+                      metrics=metrics, incremental=incremental, network=network, guard=guard) as engine:
+        async for rec in engine.stream(max_routes=max_routes, max_trips=max_trips, dates=dates, budget=budget,
+                                       shard=shard):
+            yield rec
+
+_DONE = object()
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def iter_site(site, buffer=STREAM_BUFFER, **kwargs):
+    """Blocking generator over stream_site(site, **kwargs). The engine runs on
+    a background thread at most `buffer` trips ahead of the consumer; breaking
+    out of the loop shuts the browser down."""
+    q = queue.Queue(maxsize=max(1, buffer))
+    stop = threading.Event()
+
+    async def produce():
+        async for rec in stream_site(site, **kwargs):
+            if not await asyncio.to_thread(_put, q, rec, stop):
+                break
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except BaseException as e:
+            _put(q, e, stop)
+        _put(q, _DONE, stop)
+
+    thread = threading.Thread(target=run, name=f"{site.name}-stream", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
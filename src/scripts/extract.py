@@ -0,0 +1,158 @@
+"""Bulk DOM extraction: one page.evaluate per page instead of an
+ElementHandle round trip per field.
+
+Fields are declared as {name: selector} or {name: {"selector": ..., "attrs": [...],
+"text": "inner"}}. A selector of None reads the item node itself, "attrs" are
+read in order when the text is empty, and text="inner" uses innerText
+(rendered text, like ElementHandle.inner_text) instead of textContent.
+A fallback selector never reads more than FALLBACK_CAP nodes.
+
+Lazy-loaded result lists are read with scroll_down between extractions.
+It only scrolls when there is something to scroll to (content below the
+viewport, a scrollable list container, or a load-more sentinel), waits
+QUICK_SETTLE_MS for the list to grow, and waits up to SCROLL_SETTLE_MS
+only while an XHR/fetch started by the scroll may still add rows, so a
+complete list costs no fixed sleep.
+"""
+
+FALLBACK_CAP = 200
+SCROLL_SETTLE_MS = 2500
+QUICK_SETTLE_MS = 300
+LOAD_MORE_SELECTOR = "[class*='load-more'], [class*='loadMore'], [class*='infinite'], [data-testid*='load-more']"
+
+_EXTRACT_FN = """
+(itemSelectors, require, fallback, fields, limit, cap) => {
+    const read = (root, spec) => {
+        const el = spec.selector ? root.querySelector(spec.selector) : root;
+        if (!el) return '';
+        let v = ((spec.text === 'inner' ? el.innerText : el.textContent) || '').trim();
+        if (!v && spec.attrs) {
+            for (const a of spec.attrs) {
+                const x = el.getAttribute(a);
+                if (x) { v = x.trim(); break; }
+            }
+        }
+        return v;
+    };
+    let items = [];
+    for (const sel of itemSelectors) {
+        items = Array.from(document.querySelectorAll(sel));
+        if (items.length) {
+            if (require) {
+                const kept = items.filter(n => n.querySelector(require));
+                if (kept.length) items = kept;
+            }
+            break;
+        }
+    }
+    if (!items.length && fallback) items = Array.from(document.querySelectorAll(fallback)).slice(0, cap);
+    if (limit) items = items.slice(0, limit);
+    return items.map(item => {
+        const row = {};
+        for (const [name, spec] of Object.entries(fields)) row[name] = read(item, spec);
+        return row;
+    });
+}
+"""
+
+# candidates in order; the first whose rows carry every required field wins.
+# Only rows after the first `skip` are returned, so a scrolled list can be
+# read again without shipping the rows already seen.
+_FIRST_JS = """
+([candidates, required, skip]) => {
+    const extract = """ + _EXTRACT_FN + """;
+    const ok = row => required.every(k => row[k]);
+    for (let i = 0; i < candidates.length; i++) {
+        const c = candidates[i];
+        let rows = extract(c.items, c.require, c.fallback, c.fields, c.drop_incomplete ? 0 : c.limit, c.cap);
+        if (c.drop_incomplete) {
+            rows = rows.filter(ok);
+            if (c.limit) rows = rows.slice(0, c.limit);
+        }
+        if (rows.some(ok)) return [i, rows.slice(skip)];
+    }
+    return [-1, []];
+}
+"""
+
+_FIELDS_JS = """
+(fields) => {
+    const row = {};
+    for (const [name, spec] of Object.entries(fields)) {
+        const el = document.querySelector(spec.selector);
+        row[name] = el ? ((spec.text === 'inner' ? el.innerText : el.textContent) || '').trim() : '';
+    }
+    return row;
+}
+"""
+
+# [height, items, scrolled]; nothing is scrolled when the list cannot grow
+_SCROLL_JS = """
+([sel, loadMore]) => {
+    const doc = document.scrollingElement || document.body;
+    const nodes = sel ? document.querySelectorAll(sel) : [];
+    const last = nodes.length ? nodes[nodes.length - 1] : null;
+    let box = last ? last.parentElement : null;
+    while (box && box !== doc && !(box.scrollHeight > box.clientHeight + 1
+            && /(auto|scroll)/.test(getComputedStyle(box).overflowY))) box = box.parentElement;
+    const below = doc.scrollHeight - (window.scrollY + window.innerHeight) > 1
+        || (!!box && box !== doc && box.scrollHeight - (box.scrollTop + box.clientHeight) > 1);
+    if (!below && !document.querySelector(loadMore)) return [doc.scrollHeight, nodes.length, false];
+    // scrolling the last item covers lists inside their own scroll container
+    if (last) last.scrollIntoView({block: 'end'});
+    window.scrollTo(0, doc.scrollHeight);
+    return [doc.scrollHeight, nodes.length, true];
+}
+"""
+
+_GREW_JS = """
+([sel, height, count]) => (document.scrollingElement || document.body).scrollHeight > height
+    || (!!sel && document.querySelectorAll(sel).length > count)
+"""
+
+def field_specs(fields):
+    out = {}
+    for name, spec in fields.items():
+        if spec is None or isinstance(spec, str):
+            spec = {"selector": spec}
+        out[name] = {"selector": spec.get("selector"), "attrs": list(spec.get("attrs") or []),
+                     "text": spec.get("text", "content")}
+    return out
+
+async def extract_first(page, candidates, required, skip=0):
+    """Try prepared strategy candidates (see strategy.py) in one round trip.
+    Returns (index of the winning candidate or -1, rows after the first `skip`).
+    """
+    index, rows = await page.evaluate(_FIRST_JS, [candidates, list(required), int(skip)])
+    return index, rows
+
+async def _grew(page, item_selector, height, count, timeout):
+    try:
+        await page.wait_for_function(_GREW_JS, arg=[item_selector, height, count], timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+async def scroll_down(page, item_selector=None, settle_ms=SCROLL_SETTLE_MS):
+    """Scroll to the end of the list; True when more items (or page) loaded."""
+    loading = []
+
+    def on_request(request):
+        if request.resource_type in ("xhr", "fetch"):
+            loading.append(request)
+
+    page.on("request", on_request)
+    try:
+        height, count, scrolled = await page.evaluate(_SCROLL_JS, [item_selector, LOAD_MORE_SELECTOR])
+        if not scrolled:
+            return False
+        if await _grew(page, item_selector, height, count, QUICK_SETTLE_MS):
+            return True
+        # nothing requested since the scroll: the list is complete
+        return bool(loading) and await _grew(page, item_selector, height, count, settle_ms)
+    finally:
+        page.remove_listener("request", on_request)
+
+async def extract_fields(page, fields):
+    """Page-level {name: selector} lookup in a single round trip."""
+    return await page.evaluate(_FIELDS_JS, field_specs(fields))
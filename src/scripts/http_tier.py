@@ -0,0 +1,175 @@
+import json
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from extract import FALLBACK_CAP, field_specs
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36")
+HTTP_TIMEOUT = 15
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session(pool_size=10):
+    """Process-wide keep-alive session, so route fetches reuse connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update({"User-Agent": USER_AGENT,
+                                     "Accept": "text/html,application/xhtml+xml,*/*;q=0.8"})
+        return _session
+
+def fetch_html(url, headers=None, timeout=HTTP_TIMEOUT):
+    """GET a page; returns the requests.Response (raises for HTTP errors)."""
+    resp = get_session().get(url, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    return resp
+
+def parser_available():
+    return HTMLParser is not None or BeautifulSoup is not None
+
+class _Doc:
+    """Minimal CSS-query facade over selectolax (preferred) or BeautifulSoup."""
+
+    def __init__(self, html):
+        if HTMLParser is not None:
+            self.root = HTMLParser(html)
+            self.fast = True
+        elif BeautifulSoup is not None:
+            self.root = BeautifulSoup(html, "lxml" if _has_lxml() else "html.parser")
+            self.fast = False
+        else:
+            raise RuntimeError("no HTML parser installed (selectolax or beautifulsoup4)")
+
+    def all(self, node, sel):
+        return node.css(sel) if self.fast else node.select(sel)
+
+    def first(self, node, sel):
+        return node.css_first(sel) if self.fast else node.select_one(sel)
+
+    def text(self, node):
+        return (node.text(deep=True, strip=False) if self.fast else node.get_text()).strip()
+
+    def attr(self, node, name):
+        return (node.attributes.get(name) if self.fast else node.get(name)) or ""
+
+def _has_lxml():
+    try:
+        import lxml  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def parse_items(html, item_selectors, fields, limit=None, require=None, fallback=None, cap=FALLBACK_CAP, doc=None):
+    """Server-side twin of a strategy candidate's in-page extraction (extract._EXTRACT_FN),
+    same field spec and semantics."""
+    doc = doc or _Doc(html)
+    root = doc.root
+    if isinstance(item_selectors, str):
+        item_selectors = [item_selectors]
+    items = []
+    for sel in item_selectors:
+        items = doc.all(root, sel)
+        if items:
+            if require:
+                kept = [n for n in items if doc.first(n, require) is not None]
+                items = kept or items
+            break
+    if not items and fallback:
+        items = doc.all(root, fallback)[:cap or FALLBACK_CAP]
+    if limit:
+        items = items[:limit]
+
+    specs = field_specs(fields)
+    rows = []
+    for item in items:
+        row = {}
+        for name, spec in specs.items():
+            el = doc.first(item, spec["selector"]) if spec["selector"] else item
+            value = doc.text(el) if el is not None else ""
+            if not value and el is not None:
+                for a in spec["attrs"]:
+                    value = doc.attr(el, a).strip()
+                    if value:
+                        break
+            row[name] = value
+        rows.append(row)
+    return rows
+
+_JSON_SCRIPT = re.compile(
+    r'<script[^>]*(?:id="__NEXT_DATA__"|type="application/(?:ld\+)?json")[^>]*>(.*?)</script>', re.S | re.I)
+
+def embedded_json(html):
+    """Parsed JSON blobs the page ships inline (__NEXT_DATA__, ld+json, ...)."""
+    out = []
+    for m in _JSON_SCRIPT.finditer(html):
+        try:
+            out.append(json.loads(m.group(1)))
+        except ValueError:
+            continue
+    return out
+
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for v in node.values():
+            yield from _walk(v)
+    elif isinstance(node, list):
+        for v in node:
+            yield from _walk(v)
+
+def jsonld_trips(html, limit=None):
+    """Trips described as schema.org BusTrip/Trip nodes in embedded JSON, as
+    rows with operator/departure/arrival/price keys."""
+    rows = []
+    for blob in embedded_json(html):
+        for node in _walk(blob):
+            if node.get("@type") not in ("BusTrip", "Trip"):
+                continue
+            provider = node.get("provider") or {}
+            offers = node.get("offers") or {}
+            if isinstance(offers, list):
+                offers = offers[0] if offers else {}
+            rows.append({
+                "operator": (provider.get("name") if isinstance(provider, dict) else str(provider)) or "",
+                "departure": str(node.get("departureTime") or ""),
+                "arrival": str(node.get("arrivalTime") or ""),
+                "price": str(offers.get("price") or "") if isinstance(offers, dict) else "",
+            })
+            if limit and len(rows) >= limit:
+                return rows
+    return rows
+
+def parse_first(html, candidates, required):
+    """Server-side twin of extract.extract_first: (winning candidate index or -1, rows)."""
+    doc = _Doc(html)
+    ok = lambda row: all(row.get(k) for k in required)
+    for i, c in enumerate(candidates):
+        rows = parse_items(html, c["items"], c["fields"], limit=0 if c["drop_incomplete"] else c["limit"],
+                           require=c["require"], fallback=c["fallback"], cap=c["cap"], doc=doc)
+        if c["drop_incomplete"]:
+            rows = [r for r in rows if ok(r)][:c["limit"] or None]
+        if any(ok(r) for r in rows):
+            return i, rows
+    return -1, []
+
+def complete(rows, required):
+    """True when there is at least one row and every row has all required fields."""
+    return bool(rows) and all(all(r.get(f) for f in required) for r in rows)
@@ -0,0 +1,208 @@
+"""Incremental re-scrapes: per-route fingerprints, skipping and trip deltas.
+
+For every route URL the store keeps a hash of the last extracted trip list,
+one hash per trip, and the ETag/Last-Modified validators the site sent
+with the HTML the trips were parsed from (HTTP tier only: a browser
+page's trips usually arrive over XHR, so its document validators say
+nothing about them).
+A route checked within the freshness window is skipped outright; an older
+one is first probed with a conditional GET and skipped on 304. Scraped
+routes are diffed against their previous trips and only the delta is
+emitted, each record carrying "Change": added / changed / removed.
+"""
+import hashlib
+import json
+import os
+import time
+
+from http_tier import HTTP_TIMEOUT, get_session
+from sink import NdjsonSink, compact
+
+FRESH_SECONDS = 3600
+# fields that identify a trip on a route; everything else (price, duration) may change
+TRIP_KEY_FIELDS = ("Date", "Operator", "Transport Type", "Departure Time", "Arrival Time")
+# fields that differ between runs without the trip changing
+VOLATILE_FIELDS = ("Tier", "provider", "Change")
+
+def _digest(obj):
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def trip_hash(record):
+    return _digest({k: v for k, v in record.items() if k not in VOLATILE_FIELDS})
+
+def trip_keys(records):
+    """Identity key per record; repeats of the same key on a route get a #n suffix."""
+    seen = {}
+    keys = []
+    for rec in records:
+        key = "|".join(str(rec.get(f, "")) for f in TRIP_KEY_FIELDS)
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        keys.append(f"{key}#{n}" if n else key)
+    return keys
+
+def diff_trips(route_url, old, records):
+    """Delta records between the stored trips {key: {"hash", "ident"}} and a new list."""
+    delta = []
+    keys = trip_keys(records)
+    for key, rec in zip(keys, records):
+        prev = old.get(key)
+        if prev is None:
+            delta.append(dict(rec, Change="added"))
+        elif prev["hash"] != trip_hash(rec):
+            delta.append(dict(rec, Change="changed"))
+    for key in old.keys() - set(keys):
+        delta.append(dict(old[key]["ident"], **{"Route URL": route_url, "Change": "removed"}))
+    return delta
+
+class FingerprintStore:
+    """Route fingerprints persisted as JSON between runs (see module docstring)."""
+
+    def __init__(self, path, fresh_seconds=FRESH_SECONDS, probe=True):
+        self.path = path
+        self.fresh_seconds = fresh_seconds
+        self.probe_enabled = probe
+        self.routes = {}
+        self.updated = {}       # url -> full new record list for routes that changed this run
+        self._validators = {}   # url -> (etag, last_modified) seen this run, committed on update()
+        self.stats = {"fresh": 0, "not_modified": 0, "unchanged": 0, "changed": 0,
+                      "added": 0, "changed_trips": 0, "removed": 0}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.routes = json.load(f)
+        except (OSError, ValueError):
+            self.routes = {}
+
+    @classmethod
+    def for_output(cls, output_file, **kwargs):
+        """foo.json -> foo.fp.json"""
+        return cls(os.path.splitext(output_file)[0] + ".fp.json", **kwargs)
+
+    def is_fresh(self, url, now=None):
+        entry = self.routes.get(url)
+        return bool(entry) and (now or time.time()) - entry.get("checked", 0) < self.fresh_seconds
+
+    def probe(self, url, headers=None):
+        """Conditional GET with the stored validators; True when the site answers 304."""
+        entry = self.routes.get(url)
+        if not self.probe_enabled or not entry or not (entry.get("etag") or entry.get("last_modified")):
+            return False
+        cond = dict(headers or {})
+        if entry.get("etag"):
+            cond["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            cond["If-Modified-Since"] = entry["last_modified"]
+        try:
+            resp = get_session().get(url, headers=cond, timeout=HTTP_TIMEOUT, stream=True)
+            resp.close()
+        except Exception:
+            return False
+        if resp.status_code == 304:
+            entry["checked"] = time.time()
+            return True
+        return False
+
+    def saw_headers(self, url, headers):
+        """Remember validators from an HTTP-tier response whose HTML held the route's trips."""
+        if not headers:
+            return
+        get = headers.get
+        etag = get("ETag") or get("etag")
+        last_modified = get("Last-Modified") or get("last-modified")
+        if etag or last_modified:
+            self._validators[url] = (etag, last_modified)
+
+    def no_validators(self, url):
+        """The route's trips did not come from the document (browser tier): never probe it."""
+        self._validators[url] = (None, None)
+
+    def update(self, url, records):
+        """Record a route's new trips and return its delta records.
+        An empty list is not taken as "every trip removed": it almost always
+        means a failed or blocked page, so the old fingerprint is kept.
+        """
+        if not records:
+            return []
+        old = self.routes.get(url, {})
+        list_hash = _digest([trip_hash(r) for r in records])
+        delta = [] if old.get("hash") == list_hash else diff_trips(url, old.get("trips", {}), records)
+        etag, last_modified = self._validators.pop(url, (old.get("etag"), old.get("last_modified")))
+        self.routes[url] = {
+            "hash": list_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+            "checked": time.time(),
+            "changed": time.time() if delta else old.get("changed", time.time()),
+            "trips": {key: {"hash": trip_hash(rec), "ident": {f: rec.get(f) for f in TRIP_KEY_FIELDS if f in rec}}
+                      for key, rec in zip(trip_keys(records), records)},
+        }
+        if delta:
+            self.updated[url] = records
+            self.stats["changed"] += 1
+            for rec in delta:
+                self.stats["changed_trips" if rec["Change"] == "changed" else rec["Change"]] += 1
+        else:
+            self.stats["unchanged"] += 1
+        return delta
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.routes, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def merge_into(self, json_path):
+        """Apply this run's changed routes to the dashboard JSON in place.
+        Routes that were skipped or unchanged keep their previous records.
+        """
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            current = []
+        merged = [r for r in current if r.get("Route URL") not in self.updated]
+        for records in self.updated.values():
+            merged.extend({k: v for k, v in r.items() if k != "Change"} for r in records)
+        tmp = json_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, json_path)
+        return len(merged)
+
+    def summary(self):
+        s = self.stats
+        return (f"skipped {s['fresh']} fresh + {s['not_modified']} not modified, "
+                f"{s['unchanged']} unchanged, {s['changed']} changed "
+                f"(+{s['added']} ~{s['changed_trips']} -{s['removed']} trips)")
+
+def delta_path(output_file):
+    """foo.json -> foo.delta.ndjson"""
+    return os.path.splitext(output_file)[0] + ".delta.ndjson"
+
+def add_incremental_args(parser):
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip unchanged routes and write only added/changed/removed trips to <output>.delta.ndjson")
+    parser.add_argument("--fresh-minutes", type=float, default=FRESH_SECONDS / 60,
+                        help="with --incremental, skip routes checked less than this long ago")
+    parser.add_argument("--no-probe", action="store_true",
+                        help="with --incremental, do not send conditional GETs for stale routes")
+    return parser
+
+def store_from_args(args, output_file):
+    if not getattr(args, "incremental", False):
+        return None
+    return FingerprintStore.for_output(output_file, fresh_seconds=args.fresh_minutes * 60, probe=not args.no_probe)
+
+def open_sink(output_file, resume=False, store=None):
+    """The run's NDJSON sink: foo.ndjson normally, foo.delta.ndjson in incremental mode."""
+    if store is None:
+        return NdjsonSink.for_output(output_file, resume=resume)
+    return NdjsonSink(delta_path(output_file), resume=resume)
+
+def finish(sink_path, output_file, store=None):
+    """Write the dashboard JSON: compact the stream, or apply the delta to the previous file."""
+    if store is None:
+        return compact(sink_path, output_file)
+    store.save()
+    print(f"Incremental: {store.summary()}")
+    return store.merge_into(output_file)
@@ -0,0 +1,155 @@
+"""Memory limits for long-running browser workers.
+
+An engine's memory is the RSS of the Playwright driver it started plus
+every process beneath it (Chromium's browser, GPU and renderer
+processes), read from /proc on Linux or with psutil elsewhere when it is
+installed. Engines sharing a process (the daemon runs one per source)
+therefore only see their own browser; when the driver pid is unknown the
+whole process tree is measured. Shared pages are counted once per
+process, so this is an upper bound, which is what a cap wants. Between
+pages the engine asks MemoryGuard.due() whether to:
+
+- recycle the browser context after recycle_pages pages, or once the
+  worker is above recycle_mb (its pages, caches and any leaked handles go
+  with it);
+- relaunch the browser when a fresh context still leaves it above
+  recycle_mb;
+- stop with MemoryCapExceeded when even a fresh browser is above cap_mb,
+  rather than pushing the host into swap.
+
+When a recycle leaves the browser above recycle_mb, memory-triggered
+recycles are held off for HOLDOFF_PAGES pages, or until memory drops
+below REARM_RATIO x recycle_mb, so a high baseline does not relaunch
+Chromium on every page. The cap is always checked.
+
+A watchdog task samples every WATCH_INTERVAL seconds, so growth during a
+page load is seen at the next page and the reported peak covers it.
+"""
+import asyncio
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RECYCLE_PAGES = 200
+RECYCLE_MB = 1536
+MEMORY_CAP_MB = 3072
+WATCH_INTERVAL = 2.0
+HOLDOFF_PAGES = 50
+REARM_RATIO = 0.8
+
+class MemoryCapExceeded(RuntimeError):
+    pass
+
+def _proc_tree_mb(root):
+    page_kb = os.sysconf("SC_PAGE_SIZE") / 1024
+    children, pages = {}, {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "r") as f:
+                # "pid (comm) state ppid ..."; comm may contain spaces and parens
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{name}/statm", "r") as f:
+                pages[int(name)] = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+    total, todo = 0, [root]
+    while todo:
+        pid = todo.pop()
+        total += pages.get(pid, 0)
+        todo.extend(children.get(pid, ()))
+    return total * page_kb / 1024
+
+def _psutil_tree_mb(root):
+    proc = psutil.Process(root)
+    total = 0
+    for p in [proc] + proc.children(recursive=True):
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+def worker_rss_mb(pid=None):
+    """RSS of a process and its descendants in MB, or None where it cannot be read."""
+    pid = pid or os.getpid()
+    if os.path.isdir("/proc/self"):
+        return _proc_tree_mb(pid)
+    if psutil is not None:
+        return _psutil_tree_mb(pid)
+    return None
+
+class MemoryGuard:
+    def __init__(self, recycle_pages=RECYCLE_PAGES, recycle_mb=RECYCLE_MB, cap_mb=MEMORY_CAP_MB,
+                 sample=worker_rss_mb, holdoff_pages=HOLDOFF_PAGES):
+        self.recycle_pages = recycle_pages
+        self.recycle_mb = recycle_mb
+        self.cap_mb = cap_mb
+        self._sample = sample
+        self.holdoff_pages = holdoff_pages
+        self.pid = None       # root of the measured process tree; None is this process
+        self.pages = 0        # pages since the context was last recycled
+        self.holdoff = 0      # pages left before memory may trigger a recycle again
+        self.last_mb = None
+        self.peak_mb = 0.0
+        self.stats = {"pages": 0, "recycles": 0, "relaunches": 0}
+
+    def sample(self):
+        mb = self._sample(self.pid)
+        if mb is not None:
+            self.last_mb = mb
+            self.peak_mb = max(self.peak_mb, mb)
+            if self.recycle_mb and mb < self.recycle_mb * REARM_RATIO:
+                self.holdoff = 0
+        return mb
+
+    def page(self):
+        self.pages += 1
+        self.stats["pages"] += 1
+        self.holdoff = max(0, self.holdoff - 1)
+
+    def recycled(self):
+        """Book-keeping after a recycle, once memory has been sampled again."""
+        self.pages = 0
+        self.holdoff = self.holdoff_pages if self.above_recycle() else 0
+
+    def due(self):
+        """'pages' or 'memory' when the context should be recycled before the next page, else None."""
+        if self.recycle_pages and self.pages >= self.recycle_pages:
+            return "pages"
+        if self.above_cap() or (not self.holdoff and self.above_recycle()):
+            return "memory"
+        return None
+
+    def above_recycle(self):
+        return bool(self.recycle_mb) and self.last_mb is not None and self.last_mb >= self.recycle_mb
+
+    def above_cap(self):
+        return bool(self.cap_mb) and self.last_mb is not None and self.last_mb >= self.cap_mb
+
+    async def watch(self, interval=WATCH_INTERVAL):
+        while True:
+            await asyncio.to_thread(self.sample)
+            await asyncio.sleep(interval)
+
+    def summary(self):
+        return dict(self.stats, peak_mb=round(self.peak_mb, 1),
+                    last_mb=None if self.last_mb is None else round(self.last_mb, 1))
+
+def add_memory_args(parser):
+    parser.add_argument("--recycle-pages", type=int, default=RECYCLE_PAGES,
+                        help="open a fresh browser context after this many pages (0: never)")
+    parser.add_argument("--recycle-mb", type=int, default=RECYCLE_MB,
+                        help="open a fresh browser context once the worker's RSS passes this (0: never)")
+    parser.add_argument("--memory-cap-mb", type=int, default=MEMORY_CAP_MB,
+                        help="stop the worker when a fresh browser is still above this RSS (0: no cap)")
+    return parser
+
+def memory_opts(args):
+    """MemoryGuard keyword arguments for the parsed memory flags."""
+    return {"recycle_pages": args.recycle_pages, "recycle_mb": args.recycle_mb, "cap_mb": args.memory_cap_mb}
@@ -0,0 +1,191 @@
+import contextvars
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds in seconds, Prometheus style (+Inf is implicit)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SLOWEST = 10
+
+_current = contextvars.ContextVar("scraper_metrics", default=None)
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Bucket upper bound covering quantile q (coarse, but cheap)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for le, c in zip(self.buckets, self.counts):
+            if c >= target:
+                return le
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 4), "max": round(self.max, 4),
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95),
+                "buckets": dict(zip((str(b) for b in self.buckets), self.counts))}
+
+class Metrics:
+    """Per-source run metrics: stage latency histograms, event counters
+    (retries, timeouts, errors, ...), bytes transferred and the slowest routes.
+    Thread-safe, since stages also run in worker threads (HTTP fetch, FX).
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.bytes = {}
+        self.slow_routes = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+
+    def incr(self, event, n=1):
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def add_bytes(self, tier, n):
+        if n and n > 0:
+            with self._lock:
+                self.bytes[tier] = self.bytes.get(tier, 0) + n
+
+    def route_done(self, url, seconds):
+        with self._lock:
+            self.slow_routes.append((round(seconds, 3), url))
+            self.slow_routes.sort(reverse=True)
+            del self.slow_routes[SLOWEST:]
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timings(self):
+        """{stage: {"seconds": total, "count": n}}, the shape the benchmarks report."""
+        with self._lock:
+            return {k: {"seconds": h.sum, "count": h.count} for k, h in self.stages.items()}
+
+    def report(self, extra=None):
+        with self._lock:
+            out = {
+                "source": self.source,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "elapsed_s": round(time.time() - self.started, 3),
+                "stages": {k: h.to_dict() for k, h in self.stages.items()},
+                "counters": dict(self.counters),
+                "bytes": dict(self.bytes),
+                "slowest_routes": [{"url": u, "seconds": s} for s, u in self.slow_routes],
+            }
+        if extra:
+            out.update(extra)
+        return out
+
+    def prometheus(self, extra_counters=None):
+        src = _label(self.source)
+        lines = ["# HELP scraper_stage_seconds Time spent per scraper stage.",
+                 "# TYPE scraper_stage_seconds histogram"]
+        with self._lock:
+            for stage, h in sorted(self.stages.items()):
+                labels = f'source="{src}",stage="{_label(stage)}"'
+                for le, c in zip(h.buckets, h.counts):
+                    lines.append(f'scraper_stage_seconds_bucket{{{labels},le="{le}"}} {c}')
+                lines.append(f'scraper_stage_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"scraper_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"scraper_stage_seconds_count{{{labels}}} {h.count}")
+            counters = dict(self.counters)
+            counters.update(extra_counters or {})
+            lines += ["# HELP scraper_events_total Scraper events (routes, trips, retries, timeouts, errors).",
+                      "# TYPE scraper_events_total counter"]
+            for event, n in sorted(counters.items()):
+                lines.append(f'scraper_events_total{{source="{src}",event="{_label(event)}"}} {n}')
+            lines += ["# HELP scraper_bytes_total Page bytes transferred.",
+                      "# TYPE scraper_bytes_total counter"]
+            for tier, n in sorted(self.bytes.items()):
+                lines.append(f'scraper_bytes_total{{source="{src}",tier="{_label(tier)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, prefix, extra=None):
+        """Write <prefix>.json (run report) and <prefix>.prom (Prometheus textfile)."""
+        with open(prefix + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.report(extra), f, indent=2)
+        counters = {k: v for k, v in (extra or {}).items() if isinstance(v, (int, float))}
+        tmp = prefix + ".prom.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus(counters))
+        os.replace(tmp, prefix + ".prom")
+
+def _label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"')
+
+def activate(metrics):
+    """Make `metrics` the target of timed()/incr() in this context (and threads spawned from it)."""
+    return _current.set(metrics)
+
+def current():
+    return _current.get()
+
+@contextmanager
+def timed(stage):
+    """Time a stage against the active Metrics; a no-op when none is active."""
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    with m.timed(stage):
+        yield
+
+def incr(event, n=1):
+    m = _current.get()
+    if m is not None:
+        m.incr(event, n)
+
+def metrics_prefix(output_file):
+    """busx_routes.json -> busx_routes.metrics (so .metrics.json / .metrics.prom)."""
+    return os.path.splitext(output_file)[0] + ".metrics"
+
+def add_metrics_args(parser):
+    parser.add_argument("--metrics", metavar="PREFIX", default=None,
+                        help="write PREFIX.json (run report) and PREFIX.prom (Prometheus textfile); "
+                             "defaults to <output>.metrics")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="scrape.prof", default=None,
+                        help="run under cProfile and dump stats to FILE (default scrape.prof)")
+    return parser
+
+def profiled(fn, path, *args, **kwargs):
+    """Call fn under cProfile, dump stats to `path` and print the top entries."""
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn, *args, **kwargs)
+    finally:
+        prof.dump_stats(path)
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(20)
+        print(f"Profile written to {path}")
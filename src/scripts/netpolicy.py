@@ -0,0 +1,176 @@
+"""Network policy for browser pages, via Playwright route interception.
+
+The scrapers only read a few text nodes, so images, media, fonts and
+third-party trackers are aborted before they are requested. Static JS/CSS
+is served from a content-addressed disk cache (.asset_cache/) shared by
+every page, context and run: bodies are stored once under their sha256 and
+an index maps each URL to its body for ASSET_TTL seconds. URLs matching
+the site's allowlist are never touched.
+
+Blocked requests and cache hits are counted on the engine's Metrics
+(net_blocked_<type>, net_trackers, asset_cache_hits/misses) and the bytes
+served from disk are reported as the "asset_cache" tier.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+BLOCK_TYPES = ("image", "media", "font")
+CACHE_TYPES = ("script", "stylesheet")
+TRACKERS = (
+    "google-analytics.com", "googletagmanager.com", "/gtag/js", "analytics.js", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "connect.facebook", "hotjar", "clarity.ms", "segment.io",
+    "segment.com", "mixpanel", "criteo", "taboola", "outbrain", "newrelic", "nr-data.net", "sentry.io",
+)
+CACHE_DIR = ".asset_cache"
+ASSET_TTL = 24 * 3600
+MAX_ASSET_BYTES = 10 * 1024 * 1024
+# headers that must not be replayed from the cache
+_HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection", "set-cookie", "date"}
+
+class AssetCache:
+    def __init__(self, root=CACHE_DIR, ttl=ASSET_TTL):
+        self.root = root
+        self.ttl = ttl
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        self.index = self._load()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _blob(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, url):
+        """(body, headers) for a fresh cached url, else None."""
+        entry = self.index.get(url)
+        if not entry or time.time() - entry["stored"] > self.ttl:
+            return None
+        try:
+            with open(self._blob(entry["sha256"]), "rb") as f:
+                return f.read(), entry["headers"]
+        except OSError:
+            return None
+
+    def put(self, url, body, headers):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        keep = {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS}
+        with self._lock:
+            self.index[url] = {"sha256": digest, "headers": keep, "stored": time.time()}
+            self._dirty = True
+
+    def save(self):
+        """Write the index, folding in entries other processes added meanwhile."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            merged = self._load()
+            merged.update(self.index)
+            tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp, self.index_path)
+            self.index, self._dirty = merged, False
+
+class NetworkPolicy:
+    def __init__(self, allow=(), block_types=BLOCK_TYPES, trackers=TRACKERS, cache=None, metrics=None):
+        self.allow = [re.compile(p) for p in allow]
+        self.block_types = set(block_types)
+        self.trackers = tuple(trackers)
+        self.cache = cache
+        self.metrics = metrics
+        self.stats = {"blocked": 0, "trackers": 0, "cache_hits": 0, "cache_misses": 0, "cache_bytes": 0}
+        self.served = set()   # urls answered from disk, so byte counters can skip them
+
+    def _incr(self, key, event, n=1):
+        self.stats[key] += n
+        if self.metrics is not None:
+            self.metrics.incr(event, n)
+
+    def verdict(self, url, resource_type):
+        """'allow', 'block', 'tracker', 'cache' or 'pass' for a request."""
+        if any(p.search(url) for p in self.allow):
+            return "allow"
+        if any(t in url for t in self.trackers):
+            return "tracker"
+        if resource_type in self.block_types:
+            return "block"
+        if self.cache is not None and resource_type in CACHE_TYPES and url.startswith("http"):
+            return "cache"
+        return "pass"
+
+    async def install(self, context):
+        await context.route("**/*", self.handle)
+        return self
+
+    async def handle(self, route):
+        request = route.request
+        verdict = self.verdict(request.url, request.resource_type)
+        try:
+            if verdict == "tracker":
+                self._incr("trackers", "net_trackers")
+                return await route.abort("blockedbyclient")
+            if verdict == "block":
+                self._incr("blocked", f"net_blocked_{request.resource_type}")
+                return await route.abort("blockedbyclient")
+            if verdict == "cache" and request.method == "GET":
+                return await self._serve_cached(route, request)
+            await route.continue_()
+        except Exception:
+            # e.g. route.fetch() reset or timed out: hand the request back to the
+            # browser, an unresolved route would stall the page until nav timeout
+            await self._release(route)
+
+    async def _release(self, route):
+        try:
+            await route.continue_()
+        except Exception:
+            try:
+                await route.abort("failed")
+            except Exception:
+                pass  # already handled, or the page has gone away
+
+    async def _serve_cached(self, route, request):
+        hit = self.cache.get(request.url)
+        if hit is not None:
+            body, headers = hit
+            self._incr("cache_hits", "asset_cache_hits")
+            self.served.add(request.url)
+            self.stats["cache_bytes"] += len(body)
+            if self.metrics is not None:
+                self.metrics.add_bytes("asset_cache", len(body))
+            return await route.fulfill(status=200, headers=headers, body=body)
+        self._incr("cache_misses", "asset_cache_misses")
+        response = await route.fetch()
+        body = await response.body()
+        cache_control = response.headers.get("cache-control", "")
+        if response.status == 200 and "no-store" not in cache_control and len(body) <= MAX_ASSET_BYTES:
+            self.cache.put(request.url, body, response.headers)
+        await route.fulfill(response=response, body=body)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.save()
+
+    def summary(self):
+        s = self.stats
+        return (f"blocked {s['blocked']} requests + {s['trackers']} trackers, "
+                f"asset cache {s['cache_hits']} hits / {s['cache_misses']} misses "
+                f"({s['cache_bytes'] / 1024:.0f} KiB served from disk)")
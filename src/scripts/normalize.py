@@ -0,0 +1,127 @@
+"""Batch normalization of scraped records with pandas/NumPy column ops.
+
+Runs after extraction on whole batches instead of per record: prices,
+durations, clock times and city names are parsed column-wise into the typed
+store columns, and every row is flagged with validation issues (zero or
+missing price, empty operator, unparsable times). The typed columns follow
+store.typed_row exactly, so both paths give the same row for a record.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from sink import iter_ndjson
+from store import BATCH_SIZE, COLUMN_NAMES, _batches
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_CLOCK = r"(\d{1,2}):(\d{2})\s*([AaPp][Mm])?"
+_DURATION = r"^\s*(?:(\d+)\s*h[a-z]*)?\s*(?:(\d+)\s*m[a-z]*)?\s*$"
+
+def _text(df, *names):
+    """Stripped string Series from the first of names with a value per row, N/A and '' as missing."""
+    out = pd.Series(pd.NA, index=df.index, dtype="string")
+    for name in names:
+        if name in df:
+            s = df[name].astype("string").str.strip()
+            out = out.fillna(s.mask(s.isin(["", "N/A"])))
+    return out
+
+def parse_prices(s):
+    """Min and max number in each cell: '1234.00', '1000-1500', '₹1,299'."""
+    nums = s.str.replace(",", "", regex=False).str.extractall(_NUM)[0].astype(float)
+    g = nums.groupby(level=0)
+    return g.min().reindex(s.index), g.max().reindex(s.index)
+
+def parse_minute_of_day(s):
+    parts = s.str.extract(_CLOCK)
+    # float, not nullable Int64: comparisons must give plain bool masks for where()
+    h = pd.to_numeric(parts[0], errors="coerce").astype(float)
+    m = pd.to_numeric(parts[1], errors="coerce").astype(float)
+    ampm = parts[2].str.lower().fillna("").to_numpy()
+    h = h.where(~((ampm == "pm") & (h < 12).to_numpy()), h + 12)
+    h = h.where(~((ampm == "am") & (h == 12).to_numpy()), 0)
+    minutes = h * 60 + m
+    return minutes.where((h <= 23) & (m <= 59))
+
+def parse_durations(s):
+    """Min and max minutes per cell, where a cell may be a range like '30m - 1h 30m'."""
+    pieces = s.str.split("-").explode()
+    parts = pieces.str.extract(_DURATION, flags=2)  # re.IGNORECASE
+    h = pd.to_numeric(parts[0], errors="coerce")
+    m = pd.to_numeric(parts[1], errors="coerce")
+    minutes = (h.fillna(0) * 60 + m.fillna(0)).where(h.notna() | m.notna())
+    g = minutes.groupby(level=0)
+    return g.min().reindex(s.index), g.max().reindex(s.index)
+
+def normalize_frame(df, source=None, scrape_date=None):
+    """Typed store columns plus `valid` and `issues` for a DataFrame of raw records."""
+    n = len(df)
+    out = pd.DataFrame(index=df.index)
+    provider = _text(df, "provider")
+    out["source"] = provider.fillna(source or "unknown")   # a record's provider wins, as in typed_row
+    out["scrape_date"] = scrape_date or datetime.date.today().isoformat()
+    out["travel_date"] = _text(df, "Date")
+    out["route_url"] = _text(df, "Route URL", "route_url")
+    out["from_city"] = _text(df, "From")
+    out["to_city"] = _text(df, "To")
+    out["operator"] = _text(df, "Operator")
+    out["transport_type"] = _text(df, "Transport Type")
+
+    price = _text(df, "Price in INR", "Price")
+    out["price_min_inr"], out["price_max_inr"] = parse_prices(price.fillna(""))
+
+    dep_raw, arr_raw = _text(df, "Departure Time"), _text(df, "Arrival Time")
+    out["departure_minute"] = parse_minute_of_day(dep_raw.fillna(""))
+    out["arrival_minute"] = parse_minute_of_day(arr_raw.fillna(""))
+
+    out["duration_minutes"], out["duration_max_minutes"] = parse_durations(_text(df, "Duration").fillna(""))
+    out["tier"] = _text(df, "Tier")
+
+    issues = {
+        "no_price": out["price_min_inr"].isna().to_numpy(),
+        "zero_price": (out["price_min_inr"] == 0).to_numpy(),
+        "no_operator": out["operator"].isna().to_numpy(),
+        "bad_departure": (dep_raw.notna() & out["departure_minute"].isna()).to_numpy(),
+        "bad_arrival": (arr_raw.notna() & out["arrival_minute"].isna()).to_numpy(),
+    }
+    labels = np.full(n, "", dtype=object)
+    for name, mask in issues.items():
+        labels = np.where(mask, labels + name + ",", labels)
+    out["issues"] = pd.Series(labels, index=df.index).str.rstrip(",")
+    out["valid"] = ~(issues["no_price"] | issues["zero_price"] | issues["no_operator"])
+
+    for col in ("duration_minutes", "duration_max_minutes", "departure_minute", "arrival_minute"):
+        out[col] = out[col].round().astype("Int32")
+    return out[COLUMN_NAMES + ["valid", "issues"]]
+
+def normalize_records(records, source=None, scrape_date=None):
+    return normalize_frame(pd.DataFrame.from_records(list(records)), source, scrape_date)
+
+def normalize_stream(records, source=None, scrape_date=None, batch_size=BATCH_SIZE):
+    """Normalized frames of at most batch_size rows from any record iterable,
+    e.g. busx.iter_busx(), without holding the whole stream in memory."""
+    for batch in _batches(records, batch_size):
+        yield normalize_records(batch, source, scrape_date)
+
+def issue_counts(frame):
+    """{source: {issue: rows}} for the flagged rows of a normalized frame."""
+    flagged = frame.loc[frame["issues"] != "", ["source", "issues"]]
+    exploded = flagged.assign(issues=flagged["issues"].str.split(",")).explode("issues")
+    counts = exploded.groupby(["source", "issues"]).size()
+    out = {}
+    for (source, issue), n in counts.items():
+        out.setdefault(source, {})[issue] = int(n)
+    return out
+
+def validate_ndjson(path, source=None, batch_size=BATCH_SIZE):
+    """Normalize an NDJSON file batch by batch; returns (rows, valid rows, issue counts)."""
+    total = valid = 0
+    counts = {}
+    for frame in normalize_stream(iter_ndjson(path), source, batch_size=batch_size):
+        total += len(frame)
+        valid += int(frame["valid"].sum())
+        for src, issues in issue_counts(frame).items():
+            for issue, n in issues.items():
+                counts.setdefault(src, {})[issue] = counts.get(src, {}).get(issue, 0) + n
+    return total, valid, counts
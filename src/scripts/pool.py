@@ -0,0 +1,73 @@
+import asyncio
+
+CONCURRENCY = 5
+
+async def gather_bounded(items, worker, concurrency=CONCURRENCY):
+    """Run worker(index, item) for every item with at most `concurrency` in flight.
+    Results come back in input order, like the serial loops.
+    """
+    sem = asyncio.Semaphore(max(1, int(concurrency or 1)))
+
+    async def run(i, item):
+        async with sem:
+            return await worker(i, item)
+
+    return await asyncio.gather(*(run(i, item) for i, item in enumerate(items, start=1)))
+
+def flatten(chunks):
+    out = []
+    for chunk in chunks:
+        if chunk:
+            out.extend(chunk)
+    return out
+
+class PagePool:
+    """Fixed set of warm pages in one browser context.
+    Pages are handed out and reused by navigating them to the next route
+    instead of being closed and recreated; a crashed page is replaced.
+    """
+
+    def __init__(self, context, size=CONCURRENCY):
+        self.context = context
+        self.size = max(1, int(size or 1))
+        self._idle = asyncio.Queue()
+        self._pages = []
+
+    async def open(self):
+        for _ in range(self.size):
+            page = await self.context.new_page()
+            self._pages.append(page)
+            self._idle.put_nowait(page)
+        return self
+
+    async def acquire(self):
+        page = await self._idle.get()
+        if page.is_closed():
+            page = await self._replace(page)
+        return page
+
+    async def release(self, page, broken=False):
+        if broken and not page.is_closed():
+            try: await page.close()
+            except Exception: pass
+        if page.is_closed():
+            page = await self._replace(page)
+        self._idle.put_nowait(page)
+
+    async def _replace(self, old):
+        page = await self.context.new_page()
+        self._pages = [page if p is old else p for p in self._pages]
+        return page
+
+    async def drain(self):
+        """Wait until every page is back in the pool, then close them all.
+        acquire() blocks until open() refills the pool (e.g. in a new context)."""
+        for _ in range(len(self._pages)):
+            await self._idle.get()
+        await self.close()
+
+    async def close(self):
+        for page in self._pages:
+            try: await page.close()
+            except Exception: pass
+        self._pages = []
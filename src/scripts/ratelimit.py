@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+class TokenBucket:
+    """Token bucket that hands out reservations.
+
+    reserve() takes a token immediately (going into debt if needed) and
+    returns how long the caller must wait, so concurrent workers queue up
+    at exactly `rate` requests/sec without holding a lock while sleeping.
+    Safe to share across threads and event loops.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_sync(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+def bucket_for(url, rate, burst=1):
+    """Shared bucket for the host of `url`; None when rate is falsy (unlimited).
+    The first caller for a host fixes its rate for the process.
+    """
+    if not rate:
+        return None
+    host = host_of(url)
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+async def throttle(url, rate, burst=1):
+    bucket = bucket_for(url, rate, burst)
+    if bucket:
+        return await bucket.acquire()
+    return 0.0
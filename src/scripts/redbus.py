@@ -1,20 +1,25 @@
-from playwright.sync_api import sync_playwright
-import json
-import time
+import datetime
 import re
 from urllib.parse import urljoin, urlparse, unquote
 
+from cli import cli_main
+from engine import Site, iter_site, run_site, scrape_site, stream_site
+from http_tier import complete, jsonld_trips
+from metrics import incr
+from pool import CONCURRENCY
+from strategy import Strategies, candidate
+from sweep import with_query
+
 HEADLESS = False
 MAX_ROUTES = None          # set to an int to limit number of route pages to visit
 MAX_TRIPS_PER_ROUTE = 10   # how many trips to scrape per route
 OUTPUT_FILE = "redbus_routes.json"
 
-def safe_text(el):
-    try:
-        t = el.text_content()
-        return t.strip() if t else ""
-    except:
-        return ""
+HOME_URL = "https://www.redbus.in/"
+
+ANCHOR_SELECTOR = "div.listWrap a.accordionLinks, a.accordionLinks"
+TRIP_ITEM_SELECTOR = "ul.srpList__ind-search-styles-module-scss-EOdde li.tupleWrapper___aa6a16, li.tupleWrapper___aa6a16"
+DATE_PARAM = "doj"  # date of journey query parameter, e.g. 17-Oct-2026
 
 def clean_price(txt):
     if not txt:
@@ -52,118 +57,132 @@ def parse_title_from_route_url(route_url):
     except:
         return "", "", ""
 
-def scrape_redbus(home_url="https://www.redbus.in/", max_routes=None, max_trips_per_route=10, headless=False):
-    results = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless, args=['--lang=en-US,en;q=0.9'])
-        context = browser.new_context(locale='en-IN', viewport={'width': 1280, 'height': 800})
-        page = context.new_page()
-        page.set_extra_http_headers({'Accept-Language': 'en-IN,en;q=0.9'})
-        try:
-            page.goto(home_url, timeout=60000, wait_until='domcontentloaded')
-            # give the page a moment to render the listWrap (if dynamic)
-            page.wait_for_timeout(1500)
-        except Exception as e:
-            print("Failed to open RedBus home:", e)
-            try: page.close()
-            except: pass
-            try: browser.close()
-            except: pass
-            return results
-
-        # Find route anchors inside the listWrap, fallback to any .accordionLinks
-        anchors = page.query_selector_all("div.listWrap a.accordionLinks, a.accordionLinks")
-        if not anchors:
-            print("No route anchors found on home page.")
-            try: page.close()
-            except: pass
-            try: browser.close()
-            except: pass
-            return results
-
-        if max_routes:
-            anchors = anchors[:max_routes]
-
-        for ai, a in enumerate(anchors, start=1):
-            try:
-                href = a.get_attribute("href") or ""
-                if not href:
-                    continue
-                route_url = href if href.startswith("http") else urljoin(home_url, href)
-                title_text, from_v, to_v = parse_title_from_route_url(route_url)
-
-                # Open route search results page
-                route_page = context.new_page()
-                try:
-                    route_page.goto(route_url, timeout=60000, wait_until='domcontentloaded')
-                    route_page.wait_for_timeout(2000)  # allow scripts to render the list
-                except Exception as e:
-                    try: route_page.close()
-                    except: pass
-                    continue
-
-                # Trip list selectors (items in search results)
-                trip_item_selector = "ul.srpList__ind-search-styles-module-scss-EOdde li.tupleWrapper___aa6a16, li.tupleWrapper___aa6a16"
-                trip_items = route_page.query_selector_all(trip_item_selector)
-                if not trip_items:
-                    # fallback to generic list items on page
-                    trip_items = route_page.query_selector_all("li")
-
-                # limit trips
-                if max_trips_per_route:
-                    trip_items = trip_items[:max_trips_per_route]
-
-                for ti, item in enumerate(trip_items, start=1):
-                    try:
-                        dep = safe_text(item.query_selector("p.boardingTime___aced27"))
-                        arr = safe_text(item.query_selector("p.droppingTime___616c2f"))
-                        dur = safe_text(item.query_selector("p.duration___5b44b1"))
-                        operator = safe_text(item.query_selector("div.travelsName___495898"))
-                        price_raw_el = item.query_selector("p.finalFare___898bb7, p.finalFare___898bb7, p.finalFare___898bb7")
-                        price_txt = safe_text(price_raw_el) if price_raw_el else ""
-                        price = clean_price(price_txt)
-                        # build object
-                        entry = {
-                            "Route URL": route_url,
-                            "Title": title_text,
-                            "From-To": title_text,
-                            "From": from_v,
-                            "To": to_v,
-                            "Duration": dur,
-                            "Price": price,
-                            "Transport Type": "Bus",
-                            "Operator": operator,
-                            "Departure Time": dep,
-                            "Arrival Time": arr
-                        }
-                        results.append(entry)
-                    except Exception:
-                        continue
-
-                try:
-                    route_page.close()
-                except:
-                    pass
-
-                # polite pause
-                time.sleep(0.8)
-
-            except Exception:
-                continue
-
-        try:
-            page.close()
-            browser.close()
-        except:
-            pass
-
-    return results
+def make_entry(route_url, title_text, from_v, to_v, dep, arr, dur, operator, price_txt):
+    return {
+        "Route URL": route_url,
+        "Title": title_text,
+        "From-To": title_text,
+        "From": from_v,
+        "To": to_v,
+        "Duration": dur,
+        "Price": clean_price(price_txt),
+        "Transport Type": "Bus",
+        "Operator": operator,
+        "Departure Time": dep,
+        "Arrival Time": arr
+    }
+
+async def discover_routes(page):
+    # Find route anchors inside the listWrap, fallback to any .accordionLinks
+    hrefs = await page.eval_on_selector_all(ANCHOR_SELECTOR, "els => els.map(a => a.getAttribute('href') || '')")
+    if not hrefs:
+        print("No route anchors found on home page.")
+    return [{"url": h if h.startswith("http") else urljoin(page.url, h)} for h in hrefs if h]
+
+TRIP_FIELDS = {
+    "dep": "p.boardingTime___aced27",
+    "arr": "p.droppingTime___616c2f",
+    "dur": "p.duration___5b44b1",
+    "operator": "div.travelsName___495898",
+    "price": "p.finalFare___898bb7",
+}
+
+# the same fields by class-name prefix, for when the build hashes change
+GENERIC_TRIP_FIELDS = {
+    "dep": "[class*='boardingTime']",
+    "arr": "[class*='droppingTime']",
+    "dur": "[class*='duration']",
+    "operator": "[class*='travelsName']",
+    "price": "[class*='finalFare']",
+}
+
+REQUIRED_FIELDS = ("dep", "operator", "price")
+LI_FALLBACK_CAP = 60
+
+TRIP_STRATEGIES = Strategies("redbus", [
+    candidate("hashed", TRIP_ITEM_SELECTOR),
+    candidate("class-prefix", "li[class*='tupleWrapper']", fields=GENERIC_TRIP_FIELDS),
+    candidate("li", fallback="li", fields=GENERIC_TRIP_FIELDS, cap=LI_FALLBACK_CAP, drop_incomplete=True),
+], TRIP_FIELDS, REQUIRED_FIELDS)
+
+def build_entries(route_url, trips):
+    title_text, from_v, to_v = parse_title_from_route_url(route_url)
+    return [make_entry(route_url, title_text, from_v, to_v, t["dep"], t["arr"], t["dur"], t["operator"], t["price"])
+            for t in trips]
+
+def http_extract(html, route, max_trips_per_route=10):
+    trips = [{"dep": t["departure"], "arr": t["arrival"], "dur": "", "operator": t["operator"], "price": t["price"]}
+             for t in jsonld_trips(html, limit=max_trips_per_route)]
+    if not complete(trips, REQUIRED_FIELDS):
+        trips = TRIP_STRATEGIES.parse(html, max_trips_per_route)
+    if not complete(trips, REQUIRED_FIELDS):
+        return []
+    return build_entries(route["url"], trips)
+
+async def stream_route(route_page, route, max_trips_per_route=10):
+    # trip items in search results, read while scrolling the lazy-loaded list;
+    # capped generic list items as the last resort
+    found = False
+    async for trips in TRIP_STRATEGIES.stream(route_page, max_trips_per_route):
+        found = True
+        yield build_entries(route["url"], trips)
+    if not found:
+        incr("empty_routes")
+
+async def extract_route(route_page, route, max_trips_per_route=10):
+    return [e async for batch in stream_route(route_page, route, max_trips_per_route) for e in batch]
+
+def date_url(url, date):
+    return with_query(url, DATE_PARAM, datetime.date.fromisoformat(date).strftime("%d-%b-%Y"))
+
+def make_site(home_url=HOME_URL):
+    return Site(
+        name="redbus",
+        home_url=home_url,
+        discover=discover_routes,
+        extract=extract_route,
+        stream=stream_route,
+        launch_args=['--lang=en-US,en;q=0.9'],
+        context_options={'locale': 'en-IN', 'viewport': {'width': 1280, 'height': 800},
+                         'extra_http_headers': {'Accept-Language': 'en-IN,en;q=0.9'}},
+        # the listWrap and result list are rendered by scripts
+        home_ready_selector=ANCHOR_SELECTOR,
+        # any candidate's items, so a redeploy does not cost the full ready_timeout per route
+        ready_selector=TRIP_STRATEGIES.ready_selector(),
+        ready_timeout=8000,
+        rate=1.25,
+        http_extract=http_extract,
+        date_url=date_url,
+    )
+
+SITE = make_site()
+
+def scrape_redbus(home_url=HOME_URL, max_routes=None, max_trips_per_route=10, headless=False, concurrency=1,
+                  **engine_opts):
+    """engine_opts (sink, metrics, rate, http_first, incremental, shard, dates, budget, guard) are passed through to the engine."""
+    return run_site(make_site(home_url), max_routes=max_routes, max_trips=max_trips_per_route,
+                    headless=headless, concurrency=concurrency, **engine_opts)
+
+async def scrape_redbus_async(home_url=HOME_URL, max_routes=None, max_trips_per_route=10,
+                              headless=False, concurrency=CONCURRENCY, **engine_opts):
+    return await scrape_site(make_site(home_url), max_routes=max_routes, max_trips=max_trips_per_route,
+                             headless=headless, concurrency=concurrency, **engine_opts)
+
+def iter_redbus(home_url=HOME_URL, max_routes=None, max_trips_per_route=10, headless=True, concurrency=CONCURRENCY,
+                **engine_opts):
+    """Trips one at a time as routes finish, e.g. for normalize.normalize_stream; stop iterating to stop scraping."""
+    return iter_site(make_site(home_url), max_routes=max_routes, max_trips=max_trips_per_route,
+                     headless=headless, concurrency=concurrency, **engine_opts)
+
+def stream_redbus(home_url=HOME_URL, max_routes=None, max_trips_per_route=10, headless=True, concurrency=CONCURRENCY,
+                  **engine_opts):
+    """Async generator version of iter_redbus."""
+    return stream_site(make_site(home_url), max_routes=max_routes, max_trips=max_trips_per_route,
+                       headless=headless, concurrency=concurrency, **engine_opts)
 
 if __name__ == "__main__":
-    data = scrape_redbus(max_routes=20 if MAX_ROUTES is None else MAX_ROUTES,
-                         max_trips_per_route=MAX_TRIPS_PER_ROUTE,
-                         headless=HEADLESS)
-    print(json.dumps(data[:10], indent=2, ensure_ascii=False))
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(data)} items to {OUTPUT_FILE}")
+    count, output = cli_main("redbus", "Scrape RedBus popular routes", OUTPUT_FILE,
+                             lambda **opts: scrape_redbus(max_routes=20 if MAX_ROUTES is None else MAX_ROUTES,
+                                                          max_trips_per_route=MAX_TRIPS_PER_ROUTE,
+                                                          headless=HEADLESS, concurrency=CONCURRENCY, **opts))
+    print(f"Saved {count} items to {output}")
@@ -0,0 +1,139 @@
+"""Retries, adaptive timeouts and per-host circuit breakers for navigation.
+
+- backoff_delay: exponential backoff with full jitter between attempts.
+- Latency: rolling per-host navigation times; once there are enough samples
+  the timeout becomes a multiple of the observed p95 (between a floor and
+  the site's nav_timeout), so a degraded host fails fast instead of holding
+  a page for 60 s.
+- CircuitBreaker: after FAILURE_THRESHOLD consecutive route failures on a
+  host it opens, new work for that host is deferred until the cooldown is
+  over, then one route is let through as a probe (half-open). The engine
+  reschedules deferred routes after the rest of the run.
+
+State is per process and per host, like the rate limiter's token buckets.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+from ratelimit import host_of
+
+BACKOFF_CAP = 30.0
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 5
+TIMEOUT_MULTIPLIER = 3.0
+MIN_TIMEOUT_MS = 10000
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+
+def backoff_delay(attempt, base=1.0, cap=BACKOFF_CAP, rng=random):
+    """Seconds to wait before retry number `attempt` (0-based): uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+class Latency:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            values = sorted(self.samples)
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def timeout_ms(self, default_ms, floor_ms=MIN_TIMEOUT_MS, multiplier=TIMEOUT_MULTIPLIER):
+        """Navigation timeout for the next request: multiplier x p95, clamped to [floor, default]."""
+        if len(self.samples) < MIN_SAMPLES:
+            return default_ms
+        p95 = self.percentile(0.95)
+        return int(min(default_ms, max(floor_ms, p95 * 1000 * multiplier)))
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, max_cooldown=MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """May a request go to this host now? In half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self):
+        """Seconds until the breaker lets a probe through (0 when closed)."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probing = False
+
+    def failure(self):
+        """Record a failed route; True when this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            was_probe = self.state == self.HALF_OPEN
+            self._probing = False
+            if was_probe or (self.state == self.CLOSED and self.failures >= self.threshold):
+                # a failed probe backs off further before the next one
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2) if was_probe else self.base_cooldown
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.opens += 1
+                return True
+            return False
+
+class HostHealth:
+    def __init__(self):
+        self.latency = Latency()
+        self.breaker = CircuitBreaker()
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+def health(url):
+    host = host_of(url)
+    with _hosts_lock:
+        h = _hosts.get(host)
+        if h is None:
+            h = _hosts[host] = HostHealth()
+        return h
+
+def report():
+    """{host: {...}} snapshot for run summaries."""
+    with _hosts_lock:
+        items = list(_hosts.items())
+    return {host: {"breaker": h.breaker.state, "opens": h.breaker.opens,
+                   "nav_p50_s": _round(h.latency.percentile(0.5)), "nav_p95_s": _round(h.latency.percentile(0.95))}
+            for host, h in items}
+
+def _round(v):
+    return None if v is None else round(v, 3)
@@ -0,0 +1,235 @@
+"""Run several scrapers at once, one worker process per source.
+
+    python run.py --sources bookaway,busx,redbus --workers 3
+
+Records from every source are streamed into one merged NDJSON file while
+each source still keeps its own <source>_routes.ndjson/.ckpt/.json and
+<source>_routes.metrics.json/.prom run report. With --incremental only the
+added/changed/removed trips are streamed, and each <source>_routes.json is
+patched in place; --parquet/--sqlite/--aggregates then read the patched
+files, which hold every current trip, instead of the delta.
+
+Each worker reports its peak memory (the process plus its browser) in the
+summary; use it with --memory-cap-mb to size --workers for the host.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing as mp
+import os
+import queue as queue_mod
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import Engine
+from incremental import FingerprintStore, add_incremental_args, finish, open_sink
+from memory import MemoryGuard, add_memory_args, memory_opts
+from metrics import Metrics, metrics_prefix, profiled
+from resilience import report as host_report
+from shard import add_shard_args, shard_output
+from pool import CONCURRENCY
+from sink import add_sink_args
+from store import typed_rows, write_parquet, write_sqlite
+from sweep import add_sweep_args, sweep_opts
+
+SOURCES = {
+    "bookaway": {"module": "bookaway", "max_trips": None},
+    "busx": {"module": "busx", "max_trips": 10},
+    "redbus": {"module": "redbus", "max_trips": 10},
+}
+MERGED_OUTPUT = "all_routes.ndjson"
+
+class QueueSink:
+    """Forwards every finished route to the parent process as well as the local sink."""
+
+    def __init__(self, inner, queue, source):
+        self.inner = inner
+        self.queue = queue
+        self.source = source
+
+    def is_done(self, route_url):
+        return self.inner.is_done(route_url)
+
+    def write_route(self, route_url, records):
+        self.inner.write_route(route_url, records)
+        if records:
+            self.queue.put((self.source, records))
+
+async def _run_engine(site, opts, sink, metrics, incremental=None, guard=None):
+    async with Engine(site, headless=opts["headless"], concurrency=opts["concurrency"],
+                      http_first=opts["http_first"], metrics=metrics, incremental=incremental,
+                      network=opts.get("network", True), guard=guard) as engine:
+        # only sources whose site knows how to put a date in a route URL are swept
+        dated = {"dates": opts.get("dates"), "budget": opts.get("budget")} if site.date_url else {}
+        await engine.run(max_routes=opts["max_routes"], max_trips=opts["max_trips"], sink=sink,
+                         shard=opts.get("shard"), **dated)
+        return dict(engine.stats, tiers=dict(engine.tiers))
+
+def run_source(source, opts, queue):
+    """Worker process entry point: scrape one source, return its summary."""
+    module = importlib.import_module(SOURCES[source]["module"])
+    opts = dict(opts)
+    if opts["max_trips"] is None:
+        opts["max_trips"] = SOURCES[source]["max_trips"]
+    start = time.monotonic()
+    metrics = Metrics(source)
+    output = shard_output(module.OUTPUT_FILE, opts.get("shard"))
+    store = None
+    if opts.get("incremental"):
+        store = FingerprintStore.for_output(output, fresh_seconds=opts["fresh_minutes"] * 60,
+                                            probe=not opts["no_probe"])
+    local = open_sink(output, opts["resume"], store)
+    guard = MemoryGuard(**opts.get("memory", {}))
+    run = lambda: asyncio.run(_run_engine(module.SITE, opts, QueueSink(local, queue, source), metrics, store, guard))
+    try:
+        summary = profiled(run, f"{source}.prof") if opts["profile"] else run()
+    except Exception as e:
+        summary = {"routes": 0, "trips": 0, "errors": 1, "fatal": str(e)[:200]}
+    finally:
+        local.close()
+    finish(local.path, output, store)
+    if store is not None:
+        summary["incremental"] = dict(store.stats)
+    summary["wall"] = round(time.monotonic() - start, 1)
+    summary["counters"] = dict(metrics.counters)
+    summary["bytes"] = dict(metrics.bytes)
+    summary["hosts"] = host_report()
+    summary["memory"] = guard.summary()
+    metrics.write(metrics_prefix(output),
+                  dict({k: summary[k] for k in ("routes", "trips", "errors", "wall") if k in summary},
+                       hosts=summary["hosts"], memory=summary["memory"]))
+    return summary
+
+def _drain(q, out, counts, block):
+    try:
+        source, records = q.get(timeout=0.2) if block else q.get_nowait()
+    except queue_mod.Empty:
+        return False
+    for rec in records:
+        rec.setdefault("provider", source)
+        out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    out.flush()
+    counts[source] = counts.get(source, 0) + len(records)
+    return True
+
+def print_summary(summaries, total_wall):
+    print(f"\n{'source':<10} {'routes':>7} {'trips':>7} {'errors':>7} {'retries':>7} {'timeouts':>8} "
+          f"{'breaker':>7} {'resched':>7} {'peak MB':>8} {'wall s':>8}")
+    for source, s in summaries.items():
+        c = s.get("counters", {})
+        print(f"{source:<10} {s.get('routes', 0):>7} {s.get('trips', 0):>7} {s.get('errors', 0):>7} "
+              f"{c.get('retries', 0):>7} {c.get('timeouts', 0):>8} {c.get('breaker_opens', 0):>7} "
+              f"{c.get('rescheduled', 0) + c.get('breaker_deferred', 0):>7} "
+              f"{s.get('memory', {}).get('peak_mb', 0):>8} {s.get('wall', 0):>8}")
+        m = s.get("memory", {})
+        if m.get("recycles"):
+            print(f"  memory: {m['recycles']} context recycles, {m['relaunches']} browser relaunches "
+                  f"over {m['pages']} pages")
+        for host, h in s.get("hosts", {}).items():
+            if h["opens"] or h["breaker"] != "closed":
+                print(f"  {host}: breaker {h['breaker']} (opened {h['opens']}x), nav p50 {h['nav_p50_s']}s "
+                      f"p95 {h['nav_p95_s']}s")
+        blocked = sum(n for k, n in c.items() if k.startswith("net_blocked_")) + c.get("net_trackers", 0)
+        if blocked or c.get("asset_cache_hits"):
+            print(f"  network: {blocked} requests blocked, {c.get('asset_cache_hits', 0)} assets from disk "
+                  f"({s.get('bytes', {}).get('asset_cache', 0) / 1024:.0f} KiB saved), "
+                  f"{s.get('bytes', {}).get('browser', 0) / 1024:.0f} KiB over the network")
+        if s.get("incremental"):
+            i = s["incremental"]
+            print(f"  incremental: {i['fresh'] + i['not_modified']} skipped, {i['changed']} changed routes, "
+                  f"+{i['added']} ~{i['changed_trips']} -{i['removed']} trips")
+        if s.get("fatal"):
+            print(f"  fatal: {s['fatal']}")
+    print(f"total wall time: {total_wall:.1f}s")
+
+def orchestrate(sources, workers=None, output=MERGED_OUTPUT, **opts):
+    start = time.monotonic()
+    ctx = mp.get_context("spawn")  # Playwright does not survive fork()
+    summaries, counts = {}, {}
+    with ctx.Manager() as manager, open(output, "a" if opts.get("resume") else "w", encoding="utf-8") as out:
+        q = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers or len(sources), mp_context=ctx) as pool:
+            futures = {pool.submit(run_source, s, opts, q): s for s in sources}
+            while not all(f.done() for f in futures):
+                _drain(q, out, counts, block=True)
+            while _drain(q, out, counts, block=False):
+                pass
+            for f, source in futures.items():
+                try:
+                    summaries[source] = f.result()
+                except Exception as e:
+                    summaries[source] = {"errors": 1, "fatal": str(e)[:200]}
+    print_summary(summaries, time.monotonic() - start)
+    print(f"Merged {sum(counts.values())} records into {output}")
+    return summaries
+
+def snapshot_inputs(sources, shard=None):
+    """{patched <source>_routes.json: source} for the sources that have one.
+    In incremental mode the merged stream only holds the run's delta."""
+    inputs = {}
+    for source in sources:
+        path = shard_output(importlib.import_module(SOURCES[source]["module"]).OUTPUT_FILE, shard)
+        if os.path.exists(path):
+            inputs[path] = source
+    return inputs
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the scrapers in parallel worker processes")
+    parser.add_argument("--sources", default=",".join(SOURCES),
+                        help=f"comma separated subset of: {', '.join(SOURCES)}")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per source)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="route pages in flight per source")
+    parser.add_argument("--max-routes", type=int, default=None)
+    parser.add_argument("--max-trips", type=int, default=None, help="trips per route (default: per source)")
+    parser.add_argument("--headful", action="store_true", help="show the browser windows")
+    parser.add_argument("--browser-only", action="store_true", help="skip the HTTP fast path")
+    parser.add_argument("--full-network", action="store_true",
+                        help="let pages load images, fonts, trackers and uncached assets")
+    parser.add_argument("--output", default=MERGED_OUTPUT, help="merged NDJSON output")
+    parser.add_argument("--parquet", metavar="DIR", help="also write the merged records as typed Parquet")
+    parser.add_argument("--sqlite", metavar="FILE", help="also write the merged records into a typed SQLite table")
+    parser.add_argument("--aggregates", metavar="FILE", nargs="?", const="route_aggregates.json",
+                        help="fold the merged records into the dedup index and write route/carrier aggregates")
+    parser.add_argument("--validate", action="store_true",
+                        help="normalize the merged records and report invalid rows (zero price, no operator, ...)")
+    parser.add_argument("--profile", action="store_true",
+                        help="run each source under cProfile and dump stats to <source>.prof")
+    for add_args in (add_sink_args, add_incremental_args, add_sweep_args, add_shard_args, add_memory_args):
+        add_args(parser)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    unknown = [s for s in sources if s not in SOURCES]
+    if unknown:
+        raise SystemExit(f"Unknown source(s): {', '.join(unknown)}")
+    args.output = shard_output(args.output, args.shard)
+    summaries = orchestrate(sources, workers=args.workers, output=args.output,
+                            headless=not args.headful, concurrency=args.concurrency,
+                            max_routes=args.max_routes, max_trips=args.max_trips,
+                            http_first=not args.browser_only, network=not args.full_network,
+                            resume=args.resume, profile=args.profile,
+                            incremental=args.incremental, fresh_minutes=args.fresh_minutes, no_probe=args.no_probe,
+                            shard=args.shard, memory=memory_opts(args), **sweep_opts(args))
+    inputs = snapshot_inputs(sources, args.shard) if args.incremental else {args.output: None}
+    rows = lambda: (row for path, source in inputs.items() for row in typed_rows(path, source))
+    if args.parquet:
+        print(f"Wrote {write_parquet(rows(), args.parquet)} typed rows to {args.parquet}")
+    if args.sqlite:
+        print(f"Wrote {write_sqlite(rows(), args.sqlite)} typed rows to {args.sqlite}")
+    if args.aggregates:
+        from trip_index import update
+        # the delta's tombstones remove trips the patched files no longer list
+        update(list(inputs) + ([args.output] if args.incremental else []), aggregates_path=args.aggregates)
+    if args.validate:
+        from normalize import validate_ndjson
+        total, valid, counts = validate_ndjson(args.output)
+        print(f"Validated {total} records: {valid} valid, {total - valid} flagged")
+        for source, issues in sorted(counts.items()):
+            print(f"  {source}: " + ", ".join(f"{k}={v}" for k, v in sorted(issues.items())))
+    return summaries
+
+if __name__ == "__main__":
+    main()
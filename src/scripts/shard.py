@@ -0,0 +1,142 @@
+"""Deterministic route sharding across machines, and merging the shard outputs.
+
+    python busx.py --shard 1/3            # on node 1 -> busx_routes.shard-1-of-3.json
+    python busx.py --shard 2/3            # on node 2 ...
+    python shard.py busx_routes.json busx_routes.shard-*.json
+
+A route belongs to shard (sha1(url without query) mod N) + 1, so the same
+route lands on the same node on every run, whatever order the home page
+lists it in.
+The merge step combines the shard files into one output, keeps each
+route only from the shard its URL hashes to, and reports shards that are
+missing.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+from sink import iter_ndjson
+
+_SHARD_FILE = re.compile(r"\.shard-(\d+)-of-(\d+)\.(?:json|ndjson)$")
+
+def parse_shard(text):
+    """'2/4' -> (2, 4); shards are numbered from 1."""
+    m = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", text or "")
+    if not m or not 1 <= int(m.group(1)) <= int(m.group(2)):
+        raise argparse.ArgumentTypeError(f"expected i/N with 1 <= i <= N, got {text!r}")
+    return int(m.group(1)), int(m.group(2))
+
+def shard_of(url, count):
+    # query and fragment are ignored, so dated sweep URLs stay on their route's shard
+    parts = urlsplit(url.strip())
+    digest = hashlib.sha1(f"{parts.scheme}://{parts.netloc}{parts.path}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def shard_routes(routes, shard):
+    if not shard:
+        return routes
+    i, n = shard
+    return [r for r in routes if shard_of(r["url"], n) == i]
+
+def shard_output(output_file, shard):
+    """busx_routes.json -> busx_routes.shard-2-of-4.json"""
+    if not shard:
+        return output_file
+    base, ext = os.path.splitext(output_file)
+    return f"{base}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+def add_shard_args(parser):
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="i/N",
+                        help="only scrape the routes of shard i out of N (stable hash of the route URL)")
+    return parser
+
+def _records(path):
+    if path.endswith(".ndjson"):
+        return iter_ndjson(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _record_key(rec):
+    return json.dumps({k: v for k, v in rec.items() if k not in ("Tier", "provider")},
+                      sort_keys=True, ensure_ascii=False)
+
+def merge(paths, output):
+    """Merge shard outputs into `output`; returns a report dict.
+
+    A route's records are taken from the shard its URL hashes to. Copies
+    of the route found in other shards (e.g. a node that ran with a stale
+    N; the largest N seen wins) are dropped as overlap; when the owning shard's file is missing
+    they are kept and reported as misplaced instead.
+    """
+    shards, counts = {}, set()
+    for path in paths:
+        m = _SHARD_FILE.search(path)
+        if m:
+            shards[(int(m.group(1)), int(m.group(2)))] = path
+            counts.add(int(m.group(2)))
+    total = max(counts) if counts else 0   # files with a smaller N came from a stale node
+    merged, seen = [], set()
+    duplicates = overlap = misplaced = 0
+    for path in sorted(paths):
+        m = _SHARD_FILE.search(path)
+        for rec in _records(path):
+            url = rec.get("Route URL")
+            if m and url:
+                owner = shard_of(url, total)
+                if (owner, total) != (int(m.group(1)), int(m.group(2))):
+                    if (owner, total) in shards:
+                        overlap += 1
+                        continue
+                    misplaced += 1
+            key = _record_key(rec)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            merged.append(rec)
+    report = {
+        "files": len(paths),
+        "records": len(merged),
+        "duplicates": duplicates,
+        "overlap": overlap,
+        "misplaced": misplaced,
+        "shard_count": total,
+        "missing_shards": [i for i in range(1, total + 1) if (i, total) not in shards],
+        "conflicting_counts": sorted(counts) if len(counts) > 1 else [],
+    }
+    tmp = output + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, output)
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge per-shard scraper outputs into one dataset")
+    parser.add_argument("output", help="merged JSON output, e.g. busx_routes.json")
+    parser.add_argument("inputs", nargs="*",
+                        help="shard outputs (default: <output base>.shard-*-of-*.json next to the output)")
+    args = parser.parse_args(argv)
+    inputs = args.inputs or glob.glob(os.path.splitext(args.output)[0] + ".shard-*-of-*.json")
+    if not inputs:
+        raise SystemExit("no shard outputs found")
+    report = merge(inputs, args.output)
+    print(f"Merged {report['records']} records from {report['files']} files into {args.output} "
+          f"({report['duplicates']} duplicates dropped)")
+    if report["overlap"]:
+        print(f"⚠️  {report['overlap']} records dropped from shards their route URL does not hash to "
+              f"(kept from the owning shard)")
+    if report["misplaced"]:
+        print(f"⚠️  {report['misplaced']} records sit in a shard their route URL does not hash to "
+              f"and the owning shard is missing")
+    if report["conflicting_counts"]:
+        print(f"⚠️  shard files disagree on N: {report['conflicting_counts']}")
+    if report["missing_shards"]:
+        print(f"⚠️  missing shards: {', '.join(map(str, report['missing_shards']))} of {report['shard_count']}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import json
+import os
+
+class NdjsonSink:
+    """Streams records to an NDJSON file as routes finish.
+
+    After a route's records are written and flushed its URL is appended to
+    the checkpoint file. With resume=True, routes listed there are skipped,
+    and records from a route that never reached the checkpoint (a crash
+    mid-route) are dropped so the route can be scraped again cleanly.
+    """
+
+    def __init__(self, path, checkpoint_path=None, resume=False):
+        self.path = path
+        self.checkpoint_path = checkpoint_path or os.path.splitext(path)[0] + ".ckpt"
+        self.done = set()
+        self.records = 0
+        if resume:
+            self.done = self._load_checkpoint()
+            self._drop_unfinished()
+        else:
+            open(self.path, "w", encoding="utf-8").close()
+            open(self.checkpoint_path, "w", encoding="utf-8").close()
+        self._out = open(self.path, "a", encoding="utf-8")
+        self._ckpt = open(self.checkpoint_path, "a", encoding="utf-8")
+
+    @classmethod
+    def for_output(cls, output_file, resume=False):
+        """Sink next to a final JSON output: foo.json -> foo.ndjson + foo.ckpt."""
+        base = os.path.splitext(output_file)[0]
+        return cls(base + ".ndjson", base + ".ckpt", resume=resume)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return {line.strip() for line in f if line.strip()}
+        except OSError:
+            return set()
+
+    def _drop_unfinished(self):
+        if not os.path.exists(self.path):
+            return
+        tmp = self.path + ".tmp"
+        with open(self.path, "r", encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+            for line in src:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line
+                if rec.get("Route URL") in self.done:
+                    dst.write(line if line.endswith("\n") else line + "\n")
+                    self.records += 1
+        os.replace(tmp, self.path)
+
+    def is_done(self, route_url):
+        return route_url in self.done
+
+    def write_route(self, route_url, records):
+        for rec in records:
+            self._out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._out.flush()
+        self.records += len(records)
+        self._ckpt.write(route_url + "\n")
+        self._ckpt.flush()
+        self.done.add(route_url)
+
+    def close(self):
+        for f in (self._out, self._ckpt):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def iter_ndjson(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def compact(ndjson_path, json_path):
+    """Rewrite an NDJSON stream as the pretty-printed JSON array the dashboard reads."""
+    count = 0
+    tmp = json_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("[")
+        for rec in iter_ndjson(ndjson_path):
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(rec, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    os.replace(tmp, json_path)
+    return count
+
+def add_sink_args(parser):
+    parser.add_argument("--resume", action="store_true",
+                        help="skip routes already in the checkpoint file and append to the NDJSON stream")
+    return parser
@@ -0,0 +1,231 @@
+"""Typed trip store: turns the stringly-typed scraper records into columns
+with numeric prices, durations and times, written as Parquet partitioned by
+source/scrape_date or as an indexed SQLite table.
+
+    python store.py busx_routes.ndjson --source busx --parquet trips/ --sqlite trips.db
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import uuid
+from itertools import islice
+
+from sink import iter_ndjson
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+BATCH_SIZE = 5000
+# sources whose per-site outputs are named <source>_routes.*
+KNOWN_SOURCES = ("bookaway", "busx", "redbus")
+
+# (name, sqlite type, arrow type name)
+COLUMNS = [
+    ("source", "TEXT", "string"),
+    ("scrape_date", "TEXT", "string"),
+    ("travel_date", "TEXT", "string"),
+    ("route_url", "TEXT", "string"),
+    ("from_city", "TEXT", "string"),
+    ("to_city", "TEXT", "string"),
+    ("operator", "TEXT", "string"),
+    ("transport_type", "TEXT", "string"),
+    ("price_min_inr", "REAL", "float64"),
+    ("price_max_inr", "REAL", "float64"),
+    ("duration_minutes", "INTEGER", "int32"),
+    ("duration_max_minutes", "INTEGER", "int32"),
+    ("departure_minute", "INTEGER", "int32"),
+    ("arrival_minute", "INTEGER", "int32"),
+    ("tier", "TEXT", "string"),
+]
+COLUMN_NAMES = [c[0] for c in COLUMNS]
+
+_NUM = re.compile(r"\d+(?:\.\d+)?")
+_HM = re.compile(r"(?:(\d+)\s*h(?:ours?|rs?)?)?\s*(?:(\d+)\s*m(?:in(?:utes?|s)?)?)?", re.I)
+_CLOCK = re.compile(r"(\d{1,2}):(\d{2})\s*([AaPp][Mm])?")
+_SOURCE_FILE = re.compile(r"([a-z0-9]+)_routes\.")
+
+def parse_price_range(value):
+    """'1234.00' -> (1234.0, 1234.0); '1000-1500' -> (1000.0, 1500.0); numbers pass through."""
+    if value is None:
+        return None, None
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+    nums = [float(n) for n in _NUM.findall(str(value).replace(",", ""))]
+    if not nums:
+        return None, None
+    return min(nums), max(nums)
+
+def _duration_part(text):
+    m = _HM.fullmatch(text.strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    return int(m.group(1) or 0) * 60 + int(m.group(2) or 0)
+
+def parse_duration_range(value):
+    """'5h 30m' -> (330, 330); '30m - 1h 30m' -> (30, 90); anything else -> (None, None)."""
+    if not value:
+        return None, None
+    parts = [p for p in (_duration_part(x) for x in str(value).split("-")) if p is not None]
+    if not parts:
+        return None, None
+    return min(parts), max(parts)
+
+def parse_minute_of_day(value):
+    """'08:30' -> 510, '9:05 PM' -> 1265, ISO datetimes use their clock part."""
+    if not value:
+        return None
+    m = _CLOCK.search(str(value))
+    if not m:
+        return None
+    h, mins = int(m.group(1)), int(m.group(2))
+    ampm = (m.group(3) or "").lower()
+    if ampm == "pm" and h < 12:
+        h += 12
+    elif ampm == "am" and h == 12:
+        h = 0
+    if h > 23 or mins > 59:
+        return None
+    return h * 60 + mins
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return None if value in ("", "N/A") else value
+
+def source_from_path(path):
+    """busx_routes.ndjson / busx_routes.shard-1-of-2.json -> "busx"; None for
+    anything else, e.g. the merged all_routes.ndjson."""
+    m = _SOURCE_FILE.match(os.path.basename(path))
+    return m.group(1) if m and m.group(1) in KNOWN_SOURCES else None
+
+def typed_row(record, source=None, scrape_date=None):
+    """`source` only fills in for records without a provider field."""
+    price = record.get("Price in INR", record.get("Price"))
+    pmin, pmax = parse_price_range(price)
+    dmin, dmax = parse_duration_range(record.get("Duration"))
+    return {
+        "source": record.get("provider") or source or "unknown",
+        "scrape_date": scrape_date or datetime.date.today().isoformat(),
+        "travel_date": _clean(record.get("Date")),
+        "route_url": _clean(record.get("Route URL") or record.get("route_url")),
+        "from_city": _clean(record.get("From")),
+        "to_city": _clean(record.get("To")),
+        "operator": _clean(record.get("Operator")),
+        "transport_type": _clean(record.get("Transport Type")),
+        "price_min_inr": pmin,
+        "price_max_inr": pmax,
+        "duration_minutes": dmin,
+        "duration_max_minutes": dmax,
+        "departure_minute": parse_minute_of_day(record.get("Departure Time")),
+        "arrival_minute": parse_minute_of_day(record.get("Arrival Time")),
+        "tier": _clean(record.get("Tier")),
+    }
+
+def _batches(rows, size=BATCH_SIZE):
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def write_parquet(rows, root):
+    """Write rows under root/source=<s>/scrape_date=<d>/ as Parquet files."""
+    if pq is None:
+        raise RuntimeError("pyarrow is required for Parquet output (pip install pyarrow)")
+    schema = pa.schema([(name, getattr(pa, arrow)()) for name, _, arrow in COLUMNS])
+    written, cleared = 0, set()
+    for batch in _batches(rows):
+        # rows of a partition seen for the first time replace what an earlier
+        # run of the same day left there; later rows are appended to it
+        fresh = {(r["source"], r["scrape_date"]) for r in batch} - cleared
+        new = [r for r in batch if (r["source"], r["scrape_date"]) in fresh]
+        seen = [r for r in batch if (r["source"], r["scrape_date"]) not in fresh]
+        for part, behavior in ((new, "delete_matching"), (seen, "overwrite_or_ignore")):
+            if part:
+                pq.write_to_dataset(pa.Table.from_pylist(part, schema=schema), root,
+                                    partition_cols=["source", "scrape_date"],
+                                    basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                                    existing_data_behavior=behavior)
+        cleared |= fresh
+        written += len(batch)
+    return written
+
+def read_parquet(root, source=None, scrape_date=None, columns=None):
+    """Load (a partition-pruned slice of) the dataset as a pyarrow Table."""
+    if pq is None:
+        raise RuntimeError("pyarrow is required for Parquet input (pip install pyarrow)")
+    filters = [(k, "=", v) for k, v in (("source", source), ("scrape_date", scrape_date)) if v]
+    return pq.read_table(root, columns=columns, filters=filters or None)
+
+def open_sqlite(path):
+    conn = sqlite3.connect(path)
+    cols = ", ".join(f'"{name}" {sqltype}' for name, sqltype, _ in COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS trips ({cols})")
+    conn.execute("CREATE INDEX IF NOT EXISTS trips_source_date ON trips (source, scrape_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS trips_route ON trips (from_city, to_city)")
+    conn.execute("CREATE INDEX IF NOT EXISTS trips_price ON trips (price_min_inr)")
+    return conn
+
+def write_sqlite(rows, path, replace_partition=True):
+    """Insert rows into trips; by default a re-run replaces its own source/scrape_date slice."""
+    conn = open_sqlite(path)
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    written, cleared = 0, set()
+    try:
+        with conn:
+            for batch in _batches(rows):
+                if replace_partition:
+                    for key in {(r["source"], r["scrape_date"]) for r in batch} - cleared:
+                        conn.execute("DELETE FROM trips WHERE source = ? AND scrape_date = ?", key)
+                        cleared.add(key)
+                conn.executemany(f"INSERT INTO trips VALUES ({placeholders})",
+                                 [tuple(r[c] for c in COLUMN_NAMES) for r in batch])
+                written += len(batch)
+    finally:
+        conn.close()
+    return written
+
+def read_records(path):
+    """Records from an NDJSON stream or a JSON array output file."""
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return iter_ndjson(path)
+
+def typed_rows(path, source=None, scrape_date=None):
+    """Typed rows of a file's trips; "removed" tombstones of an incremental delta are not trips."""
+    for rec in read_records(path):
+        if rec.get("Change") != "removed":
+            yield typed_row(rec, source, scrape_date)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write scraper NDJSON output to a typed trip store")
+    parser.add_argument("inputs", nargs="+",
+                        help="NDJSON streams or JSON outputs (e.g. busx_routes.ndjson, all_routes.ndjson)")
+    parser.add_argument("--source", help="source name when records carry no provider field")
+    parser.add_argument("--scrape-date", default=datetime.date.today().isoformat())
+    parser.add_argument("--parquet", metavar="DIR", help="partitioned Parquet dataset root")
+    parser.add_argument("--sqlite", metavar="FILE", help="SQLite database file")
+    args = parser.parse_args(argv)
+    if not (args.parquet or args.sqlite):
+        parser.error("choose at least one of --parquet / --sqlite")
+
+    for path in args.inputs:
+        source = args.source or source_from_path(path)
+        if args.parquet:
+            n = write_parquet(typed_rows(path, source, args.scrape_date), args.parquet)
+            print(f"{path}: {n} rows -> {args.parquet}")
+        if args.sqlite:
+            n = write_sqlite(typed_rows(path, source, args.scrape_date), args.sqlite)
+            print(f"{path}: {n} rows -> {args.sqlite}")
+
+if __name__ == "__main__":
+    main()
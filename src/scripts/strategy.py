@@ -0,0 +1,135 @@
+"""Adaptive selector strategies with a remembered per-site winner.
+
+A site lists candidate selector sets, most specific first (e.g. the hashed
+class names, then attribute-substring selectors that survive a redeploy,
+then a capped generic fallback). The candidate that last produced rows with
+every required field is persisted in .selectors_<site>.json and tried first
+on the next page and the next run, so healthy pages cost one probe.
+
+When the remembered winner misses DRIFT_AFTER pages in a row while another
+candidate still works, that is reported as selector drift (printed, counted
+as selector_drift and logged in the cache file) and the working candidate
+becomes the new winner.
+
+stream() reads infinite-scroll lists: it extracts what is rendered, scrolls,
+and extracts only the new rows, until the trip limit is reached, there is
+nothing left to scroll or a scroll loads nothing (see extract.scroll_down),
+or IDLE_SCROLLS scrolls in a row bring no new rows.
+"""
+import json
+import os
+import threading
+import time
+
+from extract import FALLBACK_CAP, SCROLL_SETTLE_MS, extract_first, field_specs, scroll_down
+from http_tier import parse_first
+from metrics import incr
+
+DRIFT_AFTER = 3
+MAX_DRIFT_LOG = 20
+MAX_SCROLLS = 20
+IDLE_SCROLLS = 2
+
+def candidate(name, items=(), fields=None, require=None, fallback=None, cap=FALLBACK_CAP, drop_incomplete=False):
+    """One selector set. `drop_incomplete` drops rows missing a required
+    field, which is what a broad fallback (e.g. capped `li`) needs; `fields`
+    defaults to the strategy's base fields."""
+    return {"name": name, "items": [items] if isinstance(items, str) else list(items), "fields": fields,
+            "require": require, "fallback": fallback, "cap": cap, "drop_incomplete": drop_incomplete}
+
+class Strategies:
+    def __init__(self, site, candidates, fields, required, path=None):
+        self.site = site
+        self.required = tuple(required)
+        self.candidates = [dict(c, fields=field_specs(c["fields"] or fields)) for c in candidates]
+        self.path = path or f".selectors_{site}.json"
+        self._lock = threading.Lock()
+        self.state = {"winner": None, "misses": 0, "drift": []}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def ordered(self, limit=None):
+        """Candidates in try order (winner first), with the trip limit applied."""
+        winner = self.state.get("winner")
+        order = sorted(self.candidates, key=lambda c: c["name"] != winner)
+        return [dict(c, limit=int(limit or 0)) for c in order]
+
+    def ready_selector(self):
+        """Every candidate's item selectors, so a page is ready as soon as any of them renders."""
+        return ", ".join(dict.fromkeys(sel for c in self.candidates for sel in c["items"]))
+
+    def record(self, name):
+        """Book-keeping after a page: `name` is the winning candidate or None."""
+        with self._lock:
+            winner = self.state.get("winner")
+            if name is None:
+                # nothing matched at all: an empty page, not evidence against the winner
+                incr("selector_misses")
+                return
+            if winner is None or name == winner:
+                self.state["misses"] = 0
+                if winner is None:
+                    self.state["winner"] = name
+                    self._save()
+                return
+            self.state["misses"] = self.state.get("misses", 0) + 1
+            incr("selector_fallbacks")
+            if self.state["misses"] >= DRIFT_AFTER:
+                print(f"⚠️  [{self.site}] selector drift: '{winner}' failed {self.state['misses']} pages in a row, "
+                      f"switching to '{name}'")
+                incr("selector_drift")
+                self.state["drift"] = (self.state.get("drift", []) + [
+                    {"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "from": winner, "to": name}])[-MAX_DRIFT_LOG:]
+                self.state.update(winner=name, misses=0)
+                self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    async def extract(self, page, limit=None):
+        candidates = self.ordered(limit)
+        index, rows = await extract_first(page, candidates, self.required)
+        self.record(candidates[index]["name"] if index >= 0 else None)
+        return rows
+
+    async def stream(self, page, limit=None, max_scrolls=MAX_SCROLLS, settle_ms=SCROLL_SETTLE_MS):
+        """Async generator over batches of new rows, scrolling between them.
+        The first candidate that matches is kept for the rest of the page.
+        """
+        todo = self.ordered(limit)
+        winner, seen, idle = None, 0, 0
+        for step in range(max_scrolls + 1):
+            index, rows = await extract_first(page, todo, self.required, skip=seen)
+            if index >= 0 and winner is None:
+                winner = todo[index]
+                todo = [winner]
+                self.record(winner["name"])
+            if rows:
+                seen += len(rows)
+                yield rows
+            if limit and seen >= limit:
+                return
+            idle = 0 if rows else idle + 1
+            if idle >= IDLE_SCROLLS or step == max_scrolls:
+                break
+            if not await scroll_down(page, _item_selector(winner), settle_ms):
+                break
+            incr("scrolls")
+        if winner is None:
+            self.record(None)
+
+    def parse(self, html, limit=None):
+        """Same over raw HTML. Does not update the winner: server HTML often
+        lacks what the browser renders, which is not drift."""
+        return parse_first(html, self.ordered(limit), self.required)[1]
+
+def _item_selector(c):
+    if c is None:
+        return None
+    return ", ".join(c["items"]) or c["fallback"]
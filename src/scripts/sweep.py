@@ -0,0 +1,105 @@
+"""Multi-date sweeps: every route scraped for each of the next N travel dates.
+
+Jobs are ordered date-major (all routes for day 0, then day 1, ...) so the
+pooled pages interleave routes while the per-host token bucket keeps the
+request rate, and the earliest dates always finish first. A route stops
+being swept after `empty_stop` consecutive dates whose page loaded with no
+trips (the end of its booking window; dates that failed to load do not
+count), and jobs that would start after the time budget are
+dropped, so a 30-day sweep takes at most about budget + one page load.
+"""
+import datetime
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DAYS = 30
+EMPTY_STOP = 2
+PAGE_SECONDS = 3.0   # rough per-page cost used for the up-front estimate
+
+def date_range(days=DAYS, start=None):
+    start = start or datetime.date.today()
+    return [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+
+def with_query(url, key, value):
+    """url with query parameter key set to value (replacing any existing one)."""
+    parts = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != key]
+    query.append((key, value))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+def estimate_seconds(jobs, rate, concurrency, page_seconds=PAGE_SECONDS):
+    """Lower bound from the host rate limit vs what the page pool can load."""
+    by_rate = jobs / rate if rate else 0.0
+    by_pool = jobs * page_seconds / max(1, concurrency)
+    return max(by_rate, by_pool)
+
+class Sweep:
+    """Job list and early-stop/budget bookkeeping for one routes x dates sweep."""
+
+    def __init__(self, dates, empty_stop=EMPTY_STOP, budget=None):
+        self.dates = list(dates)
+        self.empty_stop = empty_stop
+        self.budget = budget
+        self.deadline = None
+        self._empty_run = {}    # base route url -> consecutive empty dates
+        self._stopped = {}      # base route url -> first date skipped
+        self.stats = {"jobs": 0, "scraped": 0, "empty": 0, "failed": 0, "exhausted_skips": 0, "budget_skips": 0}
+
+    def jobs(self, routes, date_url):
+        out = []
+        for date in self.dates:
+            for route in routes:
+                out.append(dict(route, url=date_url(route["url"], date), date=date, base_url=route["url"]))
+        self.stats["jobs"] = len(out)
+        return out
+
+    def start(self):
+        if self.budget:
+            self.deadline = time.monotonic() + self.budget
+
+    def should_run(self, job):
+        if job["base_url"] in self._stopped:
+            self.stats["exhausted_skips"] += 1
+            return False
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.stats["budget_skips"] += 1
+            return False
+        return True
+
+    def finished(self, job, records, failed=False):
+        """Tag records with their travel date and track empty dates per route.
+        A failed page says nothing about the booking window and leaves the count alone."""
+        self.stats["scraped"] += 1
+        base = job["base_url"]
+        if failed:
+            self.stats["failed"] += 1
+        elif records:
+            self._empty_run[base] = 0
+        else:
+            self.stats["empty"] += 1
+            self._empty_run[base] = self._empty_run.get(base, 0) + 1
+            if self.empty_stop and self._empty_run[base] >= self.empty_stop:
+                self._stopped.setdefault(base, job["date"])
+        for rec in records:
+            rec["Date"] = job["date"]
+        return records
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['scraped']}/{s['jobs']} route-dates scraped, {s['empty']} empty, {s['failed']} failed, "
+                f"{len(self._stopped)} routes stopped early ({s['exhausted_skips']} skipped), "
+                f"{s['budget_skips']} over budget")
+
+def add_sweep_args(parser):
+    parser.add_argument("--days", type=int, default=None,
+                        help=f"sweep this many travel dates from today per route (e.g. {DAYS})")
+    parser.add_argument("--budget-minutes", type=float, default=None,
+                        help="with --days, stop starting new route-dates after this long")
+    return parser
+
+def sweep_opts(args):
+    """Engine run() keyword arguments for the parsed sweep flags."""
+    if not args.days:
+        return {}
+    return {"dates": date_range(args.days),
+            "budget": args.budget_minutes * 60 if args.budget_minutes else None}
@@ -0,0 +1,40 @@
+"""python -m pytest test_normalize.py"""
+import pandas as pd
+
+from normalize import issue_counts, normalize_records
+from store import COLUMN_NAMES, typed_row
+
+RECORDS = [
+    {"Route URL": "https://www.bookaway.com/routes/a-to-b", "From": "A", "To": "B", "Operator": "N/A",
+     "Departure Time": "N/A", "Arrival Time": "N/A", "Duration": "N/A", "Price in INR": "N/A", "provider": "bookaway"},
+    {"Route URL": "https://www.busx.com/route/1", "From": "Bangkok", "To": "Pattaya", "Operator": "Green Bus",
+     "Departure Time": "", "Arrival Time": "10:30", "Duration": "", "Price": "350.00", "provider": "busx"},
+    {"Route URL": "https://www.redbus.in/bus-tickets/delhi-to-manali", "From": "Delhi", "To": "Manali",
+     "Operator": "Zingbus", "Departure Time": "9:05 PM", "Arrival Time": "12:10 AM", "Duration": "3h 5m",
+     "Price": "1,299", "provider": "redbus"},
+    {"Route URL": "https://www.busx.com/route/2", "From": "Bangkok", "To": "Hua Hin", "Operator": "Sombat Tour",
+     "Departure Time": "25:00", "Price": "0", "provider": "busx"},
+]
+
+def _plain(v):
+    if v is None or pd.isna(v):
+        return None
+    return float(v) if isinstance(v, (int, float)) else v
+
+def test_missing_and_na_times_do_not_crash():
+    frame = normalize_records(RECORDS[:2], scrape_date="2026-10-17")
+    assert frame["departure_minute"].isna().all()
+    assert frame["arrival_minute"].tolist()[1] == 630
+
+def test_matches_typed_row():
+    frame = normalize_records(RECORDS, scrape_date="2026-10-17")
+    for i, rec in enumerate(RECORDS):
+        expected = typed_row(rec, scrape_date="2026-10-17")
+        got = frame.iloc[i]
+        for col in COLUMN_NAMES:
+            assert _plain(got[col]) == _plain(expected[col]), (i, col, got[col], expected[col])
+
+def test_issues():
+    counts = issue_counts(normalize_records(RECORDS, scrape_date="2026-10-17"))
+    assert counts["bookaway"] == {"no_price": 1, "no_operator": 1}
+    assert counts["busx"] == {"zero_price": 1, "bad_departure": 1}
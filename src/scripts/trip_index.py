@@ -0,0 +1,277 @@
+"""Cross-source trip index with precomputed route and carrier aggregates.
+
+    python trip_index.py all_routes.ndjson                 # update trip_index.json, write route_aggregates.json
+    python trip_index.py busx_routes.json --source busx --rebuild
+
+Trips are deduplicated on a normalized (from, to, operator, departure,
+travel date, source) key: a trip seen again, in a later run or another
+output file, replaces its earlier price/duration instead of adding a row.
+Per-route and per-carrier aggregates (trip count, min/median/max price,
+duration stats) are kept alongside and only the groups touched by new
+records are recomputed, then written as one compact JSON file the backend
+can serve as-is. The groups' sorted values and summaries are saved with
+the index, so a run only pays for what it changes.
+
+Incremental deltas are applied as such: "added"/"changed" records update
+their trip and "removed" tombstones delete it. Trips whose travel date
+has passed are expired from the index and its aggregates, and so are
+trips no full output has listed for MAX_AGE_DAYS; when only deltas were
+read, which never repeat an unchanged trip, nothing is expired by age.
+"""
+import argparse
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import re
+import statistics
+
+from store import read_records, source_from_path, typed_row
+
+INDEX_FILE = "trip_index.json"
+AGGREGATES_FILE = "route_aggregates.json"
+INDEX_VERSION = 2
+MAX_AGE_DAYS = 7
+ENTRY_FIELDS = 9
+
+_SPACE = re.compile(r"\s+")
+
+def _norm(value):
+    return _SPACE.sub(" ", str(value or "")).strip().casefold()
+
+def trip_key(row):
+    """Stable key for a typed row (see store.typed_row)."""
+    parts = (row["from_city"], row["to_city"], row["operator"], row["departure_minute"],
+             row["travel_date"], row["source"])
+    return hashlib.sha1("|".join(_norm(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+def route_trip_key(row):
+    """Key of a trip within its route page: what an incremental "removed" tombstone still carries."""
+    parts = (row["route_url"], row["operator"], row["departure_minute"], row["travel_date"], row["source"])
+    return "|".join(_norm(p) for p in parts)
+
+def route_name(row):
+    return f"{row['from_city']} → {row['to_city']}"
+
+class _Group:
+    """Sorted prices/durations of one route or carrier, for exact medians."""
+
+    def __init__(self, prices=(), durations=(), sources=None):
+        self.prices = list(prices)
+        self.durations = list(durations)
+        self.sources = dict(sources or {})
+
+    def add(self, price, duration, source):
+        if price is not None:
+            bisect.insort(self.prices, price)
+        if duration is not None:
+            bisect.insort(self.durations, duration)
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+    def remove(self, price, duration, source):
+        for values, v in ((self.prices, price), (self.durations, duration)):
+            if v is not None:
+                i = bisect.bisect_left(values, v)
+                if i < len(values) and values[i] == v:
+                    del values[i]
+        self.sources[source] -= 1
+        if not self.sources[source]:
+            del self.sources[source]
+
+    def to_json(self):
+        return {"prices": self.prices, "durations": self.durations, "sources": self.sources}
+
+    def summary(self):
+        p, d = self.prices, self.durations
+        return {
+            "trips": sum(self.sources.values()),
+            "sources": dict(sorted(self.sources.items())),
+            "price_min": p[0] if p else None,
+            "price_median": round(statistics.median(p), 2) if p else None,
+            "price_max": p[-1] if p else None,
+            "duration_min": d[0] if d else None,
+            "duration_median": statistics.median(d) if d else None,
+            "duration_max": d[-1] if d else None,
+        }
+
+class TripIndex:
+    """Hash index {key: [route, carrier, source, price, duration, travel date, last seen,
+    route URL, departure minute]} plus its aggregates."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.trips = {}
+        self.routes, self.carriers = {}, {}
+        self._summaries = {"routes": {}, "carriers": {}}
+        self._dirty = set()
+        self._route_keys = None   # route_trip_key -> key, built on the first tombstone
+        self.snapshots = 0        # records read that were not part of an incremental delta
+        self.stats = {"added": 0, "updated": 0, "duplicates": 0, "skipped": 0, "removed": 0, "expired": 0}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("version") == INDEX_VERSION:
+            self.trips = state["trips"]
+            for entry in self.trips.values():
+                entry.extend([None] * (ENTRY_FIELDS - len(entry)))
+            for kind, groups in (("routes", self.routes), ("carriers", self.carriers)):
+                for name, g in state["groups"][kind].items():
+                    groups[name] = _Group(g["prices"], g["durations"], g["sources"])
+            self._summaries = state["summaries"]
+            return
+        # the first format kept only the trips: rebuild the groups once
+        today = datetime.date.today().isoformat()
+        self.trips = {k: list(v[:5]) + [None, today, None, None] for k, v in state.items()}
+        for entry in self.trips.values():
+            for kind, name, group in self._groups(entry[0], entry[1]):
+                group.prices += [entry[3]] if entry[3] is not None else []
+                group.durations += [entry[4]] if entry[4] is not None else []
+                group.sources[entry[2]] = group.sources.get(entry[2], 0) + 1
+                self._dirty.add((kind, name))
+        for group in list(self.routes.values()) + list(self.carriers.values()):
+            group.prices.sort()
+            group.durations.sort()
+
+    def _groups(self, route, carrier):
+        yield "routes", route, self.routes.setdefault(route, _Group())
+        if carrier:
+            yield "carriers", carrier, self.carriers.setdefault(carrier, _Group())
+
+    def _add(self, route, carrier, source, price, duration):
+        for kind, name, group in self._groups(route, carrier):
+            group.add(price, duration, source)
+            self._dirty.add((kind, name))
+
+    def _remove(self, route, carrier, source, price, duration):
+        for kind, name, group in self._groups(route, carrier):
+            group.remove(price, duration, source)
+            self._dirty.add((kind, name))
+
+    def add(self, record, source=None):
+        row = typed_row(record, source)
+        change = record.get("Change")
+        if change == "removed":
+            self.remove(row)
+            return
+        if change is None:
+            self.snapshots += 1
+        if not (row["from_city"] and row["to_city"]):
+            self.stats["skipped"] += 1
+            return
+        price = row["price_min_inr"] or None   # busx's "0" fallback is no price
+        entry = [route_name(row), row["operator"], row["source"], price, row["duration_minutes"],
+                 row["travel_date"], row["scrape_date"], row["route_url"], row["departure_minute"]]
+        key = trip_key(row)
+        old = self.trips.get(key)
+        if old is not None and old[:6] == entry[:6]:
+            old[6] = max(old[6] or "", entry[6])   # only the last-seen date moved
+            old[7:] = entry[7:]
+            self.stats["duplicates"] += 1
+            return
+        if old is not None:
+            self._remove(*old[:5])
+            self.stats["updated"] += 1
+        else:
+            self.stats["added"] += 1
+        self.trips[key] = entry
+        self._add(*entry[:5])
+        if self._route_keys is not None and entry[7]:
+            self._route_keys[route_trip_key(row)] = key
+
+    def remove(self, row):
+        """Apply a "removed" tombstone (a typed row with only its route URL and trip identity)."""
+        if self._route_keys is None:
+            self._route_keys = {}
+            for key, e in self.trips.items():
+                if e[7]:
+                    ident = {"route_url": e[7], "operator": e[1], "departure_minute": e[8],
+                             "travel_date": e[5], "source": e[2]}
+                    self._route_keys[route_trip_key(ident)] = key
+        key = self._route_keys.pop(route_trip_key(row), None)
+        if key in self.trips:
+            self._remove(*self.trips.pop(key)[:5])
+            self.stats["removed"] += 1
+
+    def expire(self, today=None, max_age_days=MAX_AGE_DAYS):
+        """Drop trips whose travel date has passed or not seen for max_age_days; returns how many."""
+        today = today or datetime.date.today()
+        oldest = (today - datetime.timedelta(days=max_age_days)).isoformat() if max_age_days else ""
+        today = today.isoformat()
+        gone = [k for k, e in self.trips.items() if (e[5] and e[5] < today) or (e[6] or "") < oldest]
+        for key in gone:
+            self._remove(*self.trips.pop(key)[:5])
+        self.stats["expired"] += len(gone)
+        return len(gone)
+
+    def add_all(self, records, source=None):
+        for rec in records:
+            self.add(rec, source)
+        return self
+
+    def aggregates(self):
+        """{"routes": {...}, "carriers": {...}}, recomputing only changed groups."""
+        for kind, name in self._dirty:
+            group = (self.routes if kind == "routes" else self.carriers).get(name)
+            if group is None or not group.sources:
+                self._summaries[kind].pop(name, None)
+                (self.routes if kind == "routes" else self.carriers).pop(name, None)
+            else:
+                self._summaries[kind][name] = group.summary()
+        self._dirty.clear()
+        return {kind: dict(sorted(groups.items())) for kind, groups in self._summaries.items()}
+
+    def save(self):
+        self.aggregates()   # summaries are saved too, so settle the dirty groups first
+        state = {"version": INDEX_VERSION, "trips": self.trips,
+                 "groups": {"routes": {n: g.to_json() for n, g in self.routes.items()},
+                            "carriers": {n: g.to_json() for n, g in self.carriers.items()}},
+                 "summaries": self._summaries}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def write_aggregates(self, path=AGGREGATES_FILE):
+        out = dict(self.aggregates(), trips=len(self.trips))
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+        return out
+
+def update(inputs, index_path=INDEX_FILE, aggregates_path=AGGREGATES_FILE, source=None, rebuild=False,
+           max_age_days=MAX_AGE_DAYS):
+    if rebuild and os.path.exists(index_path):
+        os.remove(index_path)
+    index = TripIndex(index_path)
+    for path in inputs:
+        index.add_all(read_records(path), source or source_from_path(path))
+    # a delta never repeats an unchanged trip, so its last-seen dates say nothing about staleness
+    index.expire(max_age_days=max_age_days if index.snapshots else 0)
+    index.save()
+    out = index.write_aggregates(aggregates_path)
+    s = index.stats
+    print(f"Indexed {len(index.trips)} unique trips (+{s['added']} new, {s['updated']} updated, "
+          f"{s['duplicates']} duplicates, {s['skipped']} without route, {s['removed']} removed, "
+          f"{s['expired']} expired); "
+          f"{len(out['routes'])} routes, {len(out['carriers'])} carriers -> {aggregates_path}")
+    return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dedup scraped trips and precompute route/carrier aggregates")
+    parser.add_argument("inputs", nargs="+", help="NDJSON streams or JSON outputs")
+    parser.add_argument("--source", help="source name when records carry no provider field")
+    parser.add_argument("--index", default=INDEX_FILE, help="dedup index state file")
+    parser.add_argument("--out", default=AGGREGATES_FILE, help="aggregates JSON for the backend")
+    parser.add_argument("--rebuild", action="store_true", help="start from an empty index")
+    parser.add_argument("--max-age-days", type=int, default=MAX_AGE_DAYS,
+                        help="expire trips no full output has listed for this many days (0: keep them)")
+    args = parser.parse_args(argv)
+    update(args.inputs, args.index, args.out, source=args.source, rebuild=args.rebuild,
+           max_age_days=args.max_age_days)
+
+if __name__ == "__main__":
+    main()